@@ -0,0 +1,204 @@
+"""
+Password hashing and signed session tokens.
+
+Passwords are stored as scrypt hashes ("scrypt$N$r$p$salt$hash"). Hashing
+is deliberately slow, so it runs on a small dedicated thread pool instead
+of the request threads or the event loop; scrypt releases the GIL, so the
+workers really run in parallel. Rows still holding a plaintext password
+(from before hashing) are accepted once and rehashed on that login, or all
+at once with:
+
+    python auth.py migrate-passwords
+
+Session tokens are HMAC-SHA256 signed claims and are verified without a
+database round trip. Set BOOKSTORE_SESSION_SECRET so tokens stay valid
+across restarts and across worker processes.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("bookstore.auth")
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_PREFIX = "scrypt$"
+
+# Hashing workers and how many hash jobs may wait for one before callers
+# are turned away (each job holds ~16 MB while it runs)
+HASH_WORKERS = max(2, min(8, os.cpu_count() or 2))
+HASH_MAX_PENDING = 256
+
+SESSION_TTL = 12 * 3600
+
+
+class HashPoolBusy(Exception):
+    """
+    Raised when more than HASH_MAX_PENDING hash jobs are queued.
+    """
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * 1024 * 1024)
+
+
+def hash_password(password):
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{HASH_PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(HASH_PREFIX)
+
+
+def verify_password(password, stored):
+    """
+    Return (matches, needs_rehash). A plaintext `stored` value (a row from
+    before hashing) always needs a rehash; so does a hash made with
+    older cost parameters.
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        expected = _unb64(digest)
+        actual = _scrypt(password, _unb64(salt), n, r, p)
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(actual, expected)
+    return matches, matches and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+# Verified against when the username does not exist, so unknown users
+# take as long to reject as wrong passwords
+DUMMY_HASH = hash_password(secrets.token_urlsafe(16))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="auth-hash")
+_pending = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+
+def submit(fn, *args):
+    """
+    Run a hashing function on the hash pool; returns a concurrent Future.
+    """
+    if not _pending.acquire(blocking=False):
+        raise HashPoolBusy()
+    future = _executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+async def run_hash(fn, *args):
+    """
+    Await a hashing function on the hash pool without blocking the event loop.
+    """
+    return await asyncio.wrap_future(submit(fn, *args))
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
+
+
+def _load_secret():
+    secret = os.environ.get("BOOKSTORE_SESSION_SECRET")
+    if secret:
+        return secret.encode()
+    logger.warning("BOOKSTORE_SESSION_SECRET is not set; session tokens are only valid "
+                   "for this process and until it restarts")
+    return secrets.token_bytes(32)
+
+
+SESSION_SECRET = _load_secret()
+
+
+def _sign(payload):
+    return _b64(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user, ttl=SESSION_TTL):
+    """
+    Signed session token for a user row (userID, username, Role).
+    """
+    claims = {"uid": user["userID"], "name": user["username"], "role": user["Role"],
+              "exp": int(time.time()) + ttl}
+    payload = _b64(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token):
+    """
+    Return the token's claims, or None if it is malformed, forged or expired.
+    """
+    payload, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_unb64(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+def migrate_passwords(conn, batch_size=200):
+    """
+    Hash every plaintext password in place; returns the number of rows updated.
+    """
+    cursor = conn.cursor()
+    updated = 0
+    try:
+        while True:
+            cursor.execute("SELECT userID, password FROM user WHERE password NOT LIKE %s LIMIT %s",
+                           (HASH_PREFIX + "%", batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return updated
+            hashes = list(_executor.map(hash_password, [password for _, password in rows]))
+            cursor.executemany("UPDATE user SET password = %s WHERE userID = %s AND password = %s",
+                               [(hashed, user_id, password) for (user_id, password), hashed in zip(rows, hashes)])
+            conn.commit()
+            updated += len(rows)
+    finally:
+        cursor.close()
+
+
+def main():
+    import mysql.connector
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description="Password storage maintenance.")
+    parser.add_argument("command", choices=["migrate-passwords"])
+    parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        print(f"Hashed {migrate_passwords(conn)} password(s)")
+    finally:
+        conn.close()
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
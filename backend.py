@@ -1,9 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 import mysql.connector
-from datetime import date, datetime
+import base64
+import csv
+import io
+import copy
+import json
+import os
+import random
+import re
+import time
+import anyio
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from db_pool import ConnectionPool, PoolTimeout
+from cache import TTLCache, TableVersions
+import rollups
+import replenishment
+import jobs
+import catalog_import
+import auth
+import metrics
+import sqltrace
+import replicas
+import fastjson
+from fastjson import json_default
 
 app = FastAPI(title="Bookstore System - Alexandria University")
 
@@ -25,7 +51,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(fastjson.CompressionMiddleware,
+                   minimum_size=int(os.environ.get("BOOKSTORE_GZIP_MIN_BYTES", "1024")))
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(sqltrace.SQLTraceMiddleware)
 
 # --- Database Connection ---
 db_config = {
@@ -34,18 +65,252 @@ db_config = {
     "password": "root",
     "database": "bookstore",
     "port": 3306,
-    "auth_plugin": "mysql_native_password"  # Use native password authentication
+    "auth_plugin": "mysql_native_password",  # Use native password authentication
 }
 
-def get_db():
+# Connection pool settings (sizes are per worker process)
+pool_config = {
+    "size": 10,            # Idle connections kept open
+    "max_overflow": 20,    # Extra connections allowed under bursts
+    "timeout": 10.0,       # Seconds to wait for a free connection
+    "recycle": 3600,       # Close connections older than this (seconds)
+    "idle_timeout": 300,   # Close connections idle longer than this (seconds)
+    "pre_ping": True,      # Ping idle connections on checkout
+}
+
+db_pool = ConnectionPool(db_config, **pool_config)
+
+def acquire_db():
+    start = time.perf_counter()
+    try:
+        return db_pool.acquire()
+    finally:
+        metrics.db_pool_wait.observe(time.perf_counter() - start)
+
+def db_session(acquire):
     try:
-        conn = mysql.connector.connect(**db_config)
+        conn, pool = acquire()
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {e}")
     except mysql.connector.Error as e:
         raise HTTPException(status_code=503, detail=f"Database connection error: {e}")
+    # Statements are counted, timed and traced per request (see /metrics
+    # and /debug/sql)
+    traced = sqltrace.instrument(conn)
+    try:
+        yield traced
+    finally:
+        traced.finish()
+        pool.release(conn)
+
+def get_db():
+    yield from db_session(lambda: (acquire_db(), db_pool))
+
+# A primary connection held only for a few statements, for routes that
+# must not keep one across a long wait (login's password hashing)
+primary_db = contextmanager(get_db)
+
+# --- Read Replicas ---
+# Same credentials as the primary; list replicas here or set
+# BOOKSTORE_REPLICAS="host:port,host:port". With none configured every
+# read goes to the primary.
+replica_configs = [
+    {**db_config, "host": host, "port": int(port or 3306)}
+    for host, _, port in (
+        item.strip().partition(":") for item in os.environ.get("BOOKSTORE_REPLICAS", "").split(",") if item.strip()
+    )
+]
+
+# Replicas further behind than max_lag seconds (or not replicating) are
+# skipped. A short checkout timeout sheds reads to the primary instead of
+# queueing on a saturated replica pool. BOOKSTORE_REPLICAS_STANDALONE=1
+# accepts servers that aren't replicas at all (e.g. a restored snapshot
+# used for reporting).
+replica_set = replicas.ReplicaSet(
+    replica_configs, {**pool_config, "timeout": 0.5},
+    max_lag=float(os.environ.get("BOOKSTORE_REPLICA_MAX_LAG", "5")), check_interval=2.0,
+    standalone=os.environ.get("BOOKSTORE_REPLICAS_STANDALONE") == "1",
+)
+
+def acquire_read_db():
+    """
+    Check out a connection on a healthy replica, falling back to the
+    primary. Returns the connection and the pool it goes back to.
+    """
+    replica = replica_set.choose()
+    if replica is not None:
+        start = time.perf_counter()
+        try:
+            conn = replica.pool.acquire()
+            replicas.read_routing.inc(replica.name)
+            return conn, replica.pool
+        except PoolTimeout:
+            pass
+        except mysql.connector.Error as e:
+            replica_set.mark_failed(replica, e)
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - start)
+    replicas.read_routing.inc("primary")
+    return acquire_db(), db_pool
+
+def get_read_db():
+    """
+    Connection for read-only routes that tolerate a few seconds of
+    replication lag. Anything that must see the caller's own writes
+    (carts, orders, login, admin lists the admin pages reload right after
+    a create or confirm) stays on get_db.
+    """
+    yield from db_session(acquire_read_db)
+
+# --- Background Jobs ---
+# Follow-up work recorded in the Job_Outbox table by write paths (see
+# jobs.py) runs on these workers after the response is sent. Handlers are
+# registered next to the routes that enqueue them.
+job_queue = jobs.JobQueue(acquire_db, db_pool.release,
+                          workers=int(os.environ.get("BOOKSTORE_JOB_WORKERS", "2")))
+
+@app.on_event("startup")
+def start_replica_monitor():
+    replica_set.start()
+
+@app.on_event("startup")
+def start_job_workers():
+    job_queue.start()
+
+@app.on_event("shutdown")
+def close_db_pool():
+    # Let queued jobs finish while the pool is still open
+    job_queue.drain(timeout=float(os.environ.get("BOOKSTORE_JOB_DRAIN_SECONDS", "10")))
+    db_pool.dispose()
+    replica_set.dispose()
+    auth.shutdown()
+
+# --- Caches ---
+# Assembled book documents (book row + authors + publisher) keyed by ISBN.
+# Every write path that changes a book must call invalidate_books().
+book_cache = TTLCache(maxsize=10000, ttl=300)
+
+def invalidate_books(*isbns):
+    book_cache.invalidate(*isbns)
+
+# --- Conditional GET ---
+# Cacheable GET routes send ETag/Last-Modified built from per-table change
+# versions and answer 304 before touching the database. Every write path
+# must call tables_changed() with the tables it wrote, after committing.
+# Validators are trusted for BOOKSTORE_VALIDATOR_MAX_AGE seconds at most,
+# which bounds staleness after writes this process doesn't see
+table_versions = TableVersions(max_age=float(os.environ.get("BOOKSTORE_VALIDATOR_MAX_AGE", "30")))
+
+CATALOG_TABLES = ("Book", "Book_Author", "Author", "Publisher")
+
+def tables_changed(*tables):
+    table_versions.bump(*tables)
+
+def replica_settle():
+    # How long a committed write may still be missing on a replica in rotation
+    return replica_set.max_lag + replica_set.check_interval if replica_set.replicas else 0.0
+
+def etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # Weak comparison: compressed and identity bodies share a tag
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in header.split(","))
+
+def modified_since(header, modified):
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return True
+    return modified > since
+
+def check_not_modified(request, response, tables, cache_control, settle=0.0):
+    """
+    Set validators and Cache-Control on the response, or raise 304 if the
+    client's copy is still current. If-None-Match wins over If-Modified-Since.
+    """
+    response.headers["Cache-Control"] = cache_control
+    validators = table_versions.validators(tables, settle)
+    if validators is None:
+        return
+    etag, modified = validators
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if modified is not None:
+        headers["Last-Modified"] = formatdate(modified, usegmt=True)
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = (if_modified_since is not None and modified is not None
+                 and not modified_since(if_modified_since, modified))
+    if fresh:
+        raise HTTPException(status_code=304, headers=headers)
+
+def conditional_get(tables, cache_control):
+    """
+    Route dependency for check_not_modified. Pass it in the route's
+    `dependencies` so it runs before a connection is checked out.
+    """
+    async def dependency(request: Request, response: Response):
+        check_not_modified(request, response, tables, cache_control)
+    return dependency
+
+async def search_conditional_get(request: Request, response: Response, userID: Optional[int] = None):
+    # Per-user results include the user's cart, so they are private and
+    # follow cart writes as well
+    if userID:
+        check_not_modified(request, response, CATALOG_TABLES + ("Cart_Item",), "private, no-cache")
+    else:
+        check_not_modified(request, response, CATALOG_TABLES, "public, max-age=10", replica_settle())
+
+book_conditional_get = conditional_get(CATALOG_TABLES, "public, max-age=10")
+
+def encode_cursor(values):
+    """
+    Encode keyset pagination values as an opaque URL-safe token.
+    """
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, types):
+    """
+    Decode a token from encode_cursor(). `types` holds the accepted types
+    of each value in order; anything else (wrong length, nested lists,
+    nulls) is rejected before it can reach the query parameters.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(types) or not all(
+            isinstance(value, accepted) and not isinstance(value, bool) for value, accepted in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+def stream_query(query, params, size=500, replica=False):
+    """
+    Run a query on a dedicated pooled connection with an unbuffered
+    (server-side) cursor and yield rows in chunks of `size`.
+    The connection is held until the generator is exhausted or closed.
+    With replica=True the connection comes from a read replica if one is
+    healthy.
+    """
+    conn, pool = acquire_read_db() if replica else (acquire_db(), db_pool)
+    traced = sqltrace.instrument(conn)
     try:
-        yield conn
+        cursor = traced.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+        traced.finish()
     finally:
-        conn.close()
+        pool.release(conn)
 
 # --- Pydantic Schemas ---
 
@@ -101,6 +366,12 @@ class PublisherOrderCreate(BaseModel):
     PubID: int
     Quantity: int
 
+class PublisherOrderBulkConfirm(BaseModel):
+    orderIDs: Optional[List[int]] = None
+    PubID: Optional[int] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+
 class AuthorCreate(BaseModel):
     author_name: str
 
@@ -108,15 +379,50 @@ class CartItemIn(BaseModel):
     ISBN: str
     Quantity: int
 
+class CartAddIn(CartItemIn):
+    Quantity: int = Field(ge=1)
+
+class CartBatchIn(BaseModel):
+    items: List[CartItemIn]
+    replace: bool = False
+
 class CheckoutIn(BaseModel):
     userID: int
     card_number: str
     card_expiry: str  # Format YYYY-MM-DD
 
 # 1. USER MANAGEMENT & AUTH
+# Passwords are hashed on auth's bounded hash pool, never on the request
+# threads or the event loop (see auth.py), and never while holding a pooled
+# connection: hashes can queue far longer than the pool is deep.
+
+async def hash_for_storage(password):
+    try:
+        return await auth.run_hash(auth.hash_password, password)
+    except auth.HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+async def signup_password_hash(data: CustomerSignup):
+    return await hash_for_storage(data.password)
+
+async def profile_password_hash(data: ProfileUpdate):
+    return await hash_for_storage(data.password) if data.password is not None else None
+
+def get_session(authorization: Optional[str] = Header(None)):
+    """
+    Claims of the caller's session token (`Authorization: Bearer <token>`).
+    Verified by signature alone, without a database query.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing session token")
+    claims = auth.verify_token(authorization[len("Bearer "):])
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
+    return claims
+
 
 @app.post("/customer/signup")
-def signup(data: CustomerSignup, conn=Depends(get_db)):
+def signup(data: CustomerSignup, password_hash: str = Depends(signup_password_hash), conn=Depends(get_db)):
     """
     New customers can sign up by providing necessary info.
     """
@@ -125,7 +431,7 @@ def signup(data: CustomerSignup, conn=Depends(get_db)):
         # Insert user with 'Customer' role
         query = """INSERT INTO user (username, password, first_name, last_name, email, phone, address, Role) 
                    VALUES (%s, %s, %s, %s, %s, %s, %s, 'Customer')"""
-        cursor.execute(query, (data.username, data.password, data.first_name, 
+        cursor.execute(query, (data.username, password_hash, data.first_name, 
                                data.last_name, data.email, data.phone, data.address))
         
         user_id = cursor.lastrowid
@@ -134,26 +440,60 @@ def signup(data: CustomerSignup, conn=Depends(get_db)):
         cursor.execute("INSERT INTO Shopping_Cart (userID) VALUES (%s)", (user_id,))
         
         conn.commit()
+        tables_changed("user", "Shopping_Cart")
         return {"message": "Account created successfully", "userID": user_id}
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=f"Signup failed: {err}")
 
+def credentials_query(username):
+    return "SELECT userID, username, Role, password FROM user WHERE username = %s", (username,)
+
+def load_credentials(username):
+    with primary_db() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(*credentials_query(username))
+        return cursor.fetchone()
+
+def store_password_hash(userID, old, new):
+    # Skipped if the password changed while the new hash was computed
+    with primary_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE user SET password = %s WHERE userID = %s AND password = %s", (new, userID, old))
+        conn.commit()
+    tables_changed("user")
+
 @app.post("/login")
-def login(data: UserLogin, conn=Depends(get_db)):
+async def login(data: UserLogin):
     """
     Only previously registered users can log in.
+    Returns a signed session token for later requests. Plaintext passwords
+    left from before hashing are upgraded to a hash here. The credentials
+    are read on a connection that goes back to the pool before hashing.
     """
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT userID, username, Role FROM user WHERE username = %s AND password = %s"
-    cursor.execute(query, (data.username, data.password))
-    user = cursor.fetchone()
-    if not user:
+    user = await run_in_threadpool(load_credentials, data.username)
+    stored = user.pop('password') if user else auth.DUMMY_HASH
+    try:
+        ok, needs_rehash = await auth.run_hash(auth.verify_password, data.password, stored)
+        if user and ok and needs_rehash:
+            new_hash = await auth.run_hash(auth.hash_password, data.password)
+            await run_in_threadpool(store_password_hash, user['userID'], stored, new_hash)
+    except auth.HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many logins in progress, please retry")
+    if not user or not ok:
         raise HTTPException(status_code=401, detail="Invalid username or password")
-    return {"status": "Logged in", "user": user}
+    return {"status": "Logged in", "user": user, "token": auth.issue_token(user), "expires_in": auth.SESSION_TTL}
+
+@app.get("/session")
+def current_session(session=Depends(get_session)):
+    """
+    Who the session token belongs to.
+    """
+    return {"userID": session["uid"], "username": session["name"], "Role": session["role"], "expires": session["exp"]}
 
 @app.put("/customer/profile/{userID}")
-def update_profile(userID: int, data: ProfileUpdate, conn=Depends(get_db)):
+def update_profile(userID: int, data: ProfileUpdate, password_hash: Optional[str] = Depends(profile_password_hash),
+                   conn=Depends(get_db)):
     """
     A registered customer can edit personal info including password.
     Handles duplicate email/username errors gracefully.
@@ -164,6 +504,8 @@ def update_profile(userID: int, data: ProfileUpdate, conn=Depends(get_db)):
         params = []
         # Convert Pydantic model to dict, removing None values
         for field, value in data.dict(exclude_none=True).items():
+            if field == "password":
+                value = password_hash
             updates.append(f"{field} = %s")
             params.append(value)
         
@@ -175,6 +517,7 @@ def update_profile(userID: int, data: ProfileUpdate, conn=Depends(get_db)):
         
         cursor.execute(query, tuple(params))
         conn.commit()
+        tables_changed("user")
         return {"message": "Profile updated successfully"}
 
     except mysql.connector.Error as err:
@@ -192,11 +535,13 @@ def logout(userID: int, conn=Depends(get_db)):
     """
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT cartID FROM Shopping_Cart WHERE userID = %s", (userID,))
-        cart = cursor.fetchone()
-        if cart:
-            cursor.execute("DELETE FROM Cart_Item WHERE cartID = %s", (cart[0],))
-            conn.commit()
+        cursor.execute("""
+            DELETE ci FROM Cart_Item ci
+            JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
+            WHERE sc.userID = %s
+        """, (userID,))
+        conn.commit()
+        tables_changed("Cart_Item")
         return {"message": "Logged out and cart cleared"}
     except Exception as e:
         conn.rollback()
@@ -205,28 +550,137 @@ def logout(userID: int, conn=Depends(get_db)):
 
 # 2. BOOK OPERATIONS (SEARCH & ADMIN)
 
-@app.get("/books/search")
-def search_books(title: Optional[str] = None, category: Optional[str] = None, isbn: Optional[str] = None, author: Optional[str] = None, userID: Optional[int] = None, conn=Depends(get_db)):
+def authors_query(isbns):
     """
-    Search books with filters.
-    Includes Publisher name and Author details.
-    Calculates stock based on user's current cart.
+    Query loading the authors of many books at once (see fetch_authors).
     """
-    cursor = conn.cursor(dictionary=True)
-    
-    # Base query joins with Publisher
-    query = """
-        SELECT DISTINCT b.*, 
+    placeholders = ','.join(['%s'] * len(isbns))
+    query = f"""
+        SELECT ba.ISBN, a.authorID, a.author_name
+        FROM Book_Author ba
+        JOIN Author a ON ba.authorID = a.authorID
+        WHERE ba.ISBN IN ({placeholders})
+    """
+    return query, tuple(isbns)
+
+def group_authors(rows, isbns):
+    authors = {isbn: [] for isbn in isbns}
+    for row in rows:
+        authors[row.pop('ISBN')].append(row)
+    return authors
+
+def fetch_authors(cursor, isbns):
+    """
+    Load authors for many books in one query, keyed by ISBN.
+    Expects a dictionary cursor.
+    """
+    isbns = list(isbns)
+    if not isbns:
+        return {}
+    cursor.execute(*authors_query(isbns))
+    return group_authors(cursor.fetchall(), isbns)
+
+def cart_quantities_query(userID, isbns):
+    """
+    Query loading a user's cart quantities for many books (see fetch_cart_quantities).
+    """
+    placeholders = ','.join(['%s'] * len(isbns))
+    query = f"""
+        SELECT ci.ISBN, ci.Quantity
+        FROM Cart_Item ci
+        JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
+        WHERE sc.userID = %s AND ci.ISBN IN ({placeholders})
+    """
+    return query, (userID, *isbns)
+
+def fetch_cart_quantities(cursor, userID, isbns):
+    """
+    Load the quantity of each book in a user's cart in one query, keyed by ISBN.
+    Expects a dictionary cursor.
+    """
+    isbns = list(isbns)
+    if not isbns:
+        return {}
+    cursor.execute(*cart_quantities_query(userID, isbns))
+    return {row['ISBN']: row['Quantity'] for row in cursor.fetchall()}
+
+# sort name -> (SQL expression, result column)
+SEARCH_SORT_COLUMNS = {
+    "title": ("b.Title", "Title"),
+    "price": ("b.Price", "Price"),
+    "year": ("b.pubYear", "pubYear"),
+    "relevance": ("ft.relevance", "relevance"),
+}
+# Cursor value types per sort key (DECIMAL prices are encoded as strings)
+SEARCH_CURSOR_TYPES = {
+    "title": str,
+    "price": (str, int, float),
+    "year": int,
+    "relevance": (int, float),
+}
+SEARCH_DEFAULT_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+
+def fulltext_terms(q):
+    """
+    Turn free text into a BOOLEAN MODE query: every word, prefix-matched.
+    Operators typed by the user are dropped.
+    """
+    words = re.findall(r"\w+", q)
+    return ' '.join(f"{word}*" for word in words)
+
+def build_search_query(title=None, category=None, isbn=None, author=None,
+                       sort="title", desc=False, cursor=None, extra_select="", extra_join="", extra_params=(), q=None):
+    """
+    Build the filtered, keyset-ordered book search query.
+    With `q`, candidates come from the FULLTEXT indexes on Book.Title and
+    Author.author_name and are scored by relevance.
+    Returns (query, params, result column of the sort key); the caller
+    appends LIMIT if needed.
+    """
+    if sort not in SEARCH_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Must be one of: {', '.join(SEARCH_SORT_COLUMNS)}")
+    sort_expr, sort_col = SEARCH_SORT_COLUMNS[sort]
+    params = []
+    source = "Book b"
+    if q is not None:
+        terms = fulltext_terms(q)
+        if not terms:
+            raise HTTPException(status_code=400, detail="Search text must contain at least one word")
+        # Title and author hits are looked up through their own FULLTEXT
+        # indexes, then summed per book
+        source = """(
+            SELECT hits.ISBN, SUM(hits.score) as relevance
+            FROM (
+                SELECT ISBN, MATCH(Title) AGAINST (%s IN BOOLEAN MODE) as score
+                FROM Book
+                WHERE MATCH(Title) AGAINST (%s IN BOOLEAN MODE)
+                UNION ALL
+                SELECT ba.ISBN, MATCH(a.author_name) AGAINST (%s IN BOOLEAN MODE) as score
+                FROM Author a
+                JOIN Book_Author ba ON ba.authorID = a.authorID
+                WHERE MATCH(a.author_name) AGAINST (%s IN BOOLEAN MODE)
+            ) hits
+            GROUP BY hits.ISBN
+        ) ft
+        JOIN Book b ON b.ISBN = ft.ISBN"""
+        params.extend([terms] * 4)
+        extra_select = ",\n               ft.relevance" + extra_select
+    elif sort == "relevance":
+        raise HTTPException(status_code=400, detail="sort=relevance requires a full-text query (q)")
+
+    # Base query joins with Publisher; the author filter is a semi-join so
+    # books with several authors are not duplicated
+    query = f"""
+        SELECT b.*, 
                p.name as publisher_name, 
                p.phone as publisher_phone, 
-               p.address as publisher_address
-        FROM Book b
-        LEFT JOIN Book_Author ba ON b.ISBN = ba.ISBN
-        LEFT JOIN Author a ON ba.authorID = a.authorID
-        LEFT JOIN Publisher p ON b.PubID = p.PubID
+               p.address as publisher_address{extra_select}
+        FROM {source}
+        LEFT JOIN Publisher p ON b.PubID = p.PubID{extra_join}
         WHERE 1=1
     """
-    params = []
+    params.extend(extra_params)
     if title:
         query += " AND b.Title LIKE %s"
         params.append(f"%{title}%")
@@ -237,38 +691,135 @@ def search_books(title: Optional[str] = None, category: Optional[str] = None, is
         query += " AND b.ISBN = %s"
         params.append(isbn)
     if author:
-        query += " AND a.author_name LIKE %s"
+        query += """ AND EXISTS (
+            SELECT 1 FROM Book_Author ba
+            JOIN Author a ON ba.authorID = a.authorID
+            WHERE ba.ISBN = b.ISBN AND a.author_name LIKE %s
+        )"""
         params.append(f"%{author}%")
+
+    # Keyset pagination over (sort key, ISBN); relevance is always best-first
+    direction, op = ("DESC", "<") if desc or sort == "relevance" else ("ASC", ">")
+    if cursor:
+        values = decode_cursor(cursor, (str, SEARCH_CURSOR_TYPES[sort], str))
+        if values[0] != sort:
+            raise HTTPException(status_code=400, detail="Pagination cursor does not match the requested sort")
+        _, last_key, last_isbn = values
+        query += f" AND ({sort_expr} {op} %s OR ({sort_expr} = %s AND b.ISBN {op} %s))"
+        params.extend([last_key, last_key, last_isbn])
+    query += f" ORDER BY {sort_expr} {direction}, b.ISBN {direction}"
+    return query, params, sort_col
+
+def search_stream_query(title, category, isbn, author, userID, sort, desc, cursor, q):
+    """
+    Single-statement variant of the search for NDJSON streaming: authors and
+    cart quantities are folded in so no follow-up queries are needed.
+    """
+    extra_select = """,
+               (SELECT JSON_ARRAYAGG(JSON_OBJECT('authorID', a.authorID, 'author_name', a.author_name))
+                FROM Book_Author ba JOIN Author a ON ba.authorID = a.authorID
+                WHERE ba.ISBN = b.ISBN) as authors_json"""
+    extra_join, extra_params = "", []
+    if userID:
+        extra_select += ", COALESCE(ci.Quantity, 0) as in_cart"
+        extra_join = """
+        LEFT JOIN Shopping_Cart sc ON sc.userID = %s
+        LEFT JOIN Cart_Item ci ON ci.cartID = sc.cartID AND ci.ISBN = b.ISBN"""
+        extra_params = [userID]
+    query, params, _ = build_search_query(title, category, isbn, author, sort, desc, cursor,
+                                          extra_select, extra_join, extra_params, q)
+    return query, tuple(params)
+
+def search_page_query(title, category, isbn, author, sort, desc, cursor, q, limit):
+    """
+    One page of search results; fetches one extra row to detect a next page.
+    """
+    if not 1 <= limit <= SEARCH_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SEARCH_MAX_PAGE_SIZE}")
+    query, params, sort_col = build_search_query(title, category, isbn, author, sort, desc, cursor, q=q)
+    query += " LIMIT %s"
+    params.append(limit + 1)
+    return query, tuple(params), sort_col
+
+def finish_search_page(response, books, limit, sort, sort_col):
+    """
+    Trim the look-ahead row and expose the next-page cursor header.
+    """
+    if len(books) > limit:
+        books = books[:limit]
+        last = books[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([sort, last[sort_col], last['ISBN']])
+    return books
+
+def apply_available_stock(books, in_cart):
+    # Calculate available stock (Available = Stock - InCart)
+    for book in books:
+        book['AvailableStock'] = max(0, book['StockQuantity'] - in_cart.get(book['ISBN'], 0))
+
+def encode_search_rows(rows):
+    """
+    Encode streamed search rows as NDJSON, one book per line.
+    """
+    lines = []
+    for book in rows:
+        book['authors'] = json.loads(book.pop('authors_json') or '[]')
+        in_cart = book.pop('in_cart', None)
+        if in_cart is not None:
+            book['AvailableStock'] = max(0, book['StockQuantity'] - in_cart)
+        lines.append(json.dumps(book, default=json_default))
+    return '\n'.join(lines) + '\n'
+
+def stream_search_results(query, params):
+    for rows in stream_query(query, params):
+        yield encode_search_rows(rows)
+
+def get_search_db(userID: Optional[int] = None, format: str = "json"):
+    if format == "ndjson":
+        # The stream checks out its own connection for as long as it runs
+        yield None
+        return
+    # Cart-adjusted stock has to see the user's own cart writes
+    yield from (get_db() if userID else get_read_db())
+
+@app.get("/books/search", dependencies=[Depends(search_conditional_get)])
+def search_books(response: Response, title: Optional[str] = None, category: Optional[str] = None, isbn: Optional[str] = None, author: Optional[str] = None, userID: Optional[int] = None,
+                 q: Optional[str] = None, sort: Optional[str] = None, desc: bool = False, limit: int = SEARCH_DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                 format: str = "json", conn=Depends(get_search_db)):
+    """
+    Search books with filters.
+    Includes Publisher name and Author details.
+    Calculates stock based on user's current cart.
+    Results are ordered by title, price or year and paginated by keyset:
+    pass the X-Next-Cursor response header back as `cursor` for the next page.
+    With format=ndjson the whole result set is streamed, one book per line.
+    `q` runs a full-text search over titles and author names; results are
+    ranked by relevance unless another sort is requested.
+    """
+    if sort is None:
+        sort = "relevance" if q is not None else "title"
+    if format == "ndjson":
+        query, params = search_stream_query(title, category, isbn, author, userID, sort, desc, cursor, q)
+        # The full list is what the admin pages reload after adding or
+        # editing a book, so it is read from the primary
+        return StreamingResponse(stream_search_results(query, params), media_type="application/x-ndjson")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="Invalid format. Must be one of: json, ndjson")
+
+    db_cursor = conn.cursor(dictionary=True)
+    query, params, sort_col = search_page_query(title, category, isbn, author, sort, desc, cursor, q, limit)
+    db_cursor.execute(query, params)
+    books = finish_search_page(response, db_cursor.fetchall(), limit, sort, sort_col)
+    isbns = [book['ISBN'] for book in books]
     
-    cursor.execute(query, tuple(params))
-    books = cursor.fetchall()
-    
-    # Get authors for each book
+    # Get authors for all books at once
+    authors = fetch_authors(db_cursor, isbns)
     for book in books:
-        cursor.execute("""
-            SELECT a.authorID, a.author_name 
-            FROM Book_Author ba
-            JOIN Author a ON ba.authorID = a.authorID
-            WHERE ba.ISBN = %s
-        """, (book['ISBN'],))
-        book['authors'] = cursor.fetchall()
+        book['authors'] = authors[book['ISBN']]
     
-    # Calculate available stock (Available = Stock - InCart)
     if userID:
-        for book in books:
-            cursor.execute("""
-                SELECT ci.Quantity 
-                FROM Cart_Item ci
-                JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
-                WHERE sc.userID = %s AND ci.ISBN = %s
-            """, (userID, book['ISBN']))
-            cart_item = cursor.fetchone()
-            if cart_item:
-                book['AvailableStock'] = max(0, book['StockQuantity'] - cart_item['Quantity'])
-            else:
-                book['AvailableStock'] = book['StockQuantity']
+        apply_available_stock(books, fetch_cart_quantities(db_cursor, userID, isbns))
     
-    return books
+    return fastjson.json_response(books, response)
 
 @app.post("/admin/books")
 def add_book(book: BookCreate, conn=Depends(get_db)):
@@ -308,40 +859,110 @@ def add_book(book: BookCreate, conn=Depends(get_db)):
                              (book.ISBN, author_id))
         
         conn.commit()
+        invalidate_books(book.ISBN)
+        tables_changed("Book", "Book_Author")
         return {"message": "Book added successfully"}
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=f"Book creation failed: {str(err)}")
 
+def request_lines(request):
+    """
+    Iterate over the request body line by line from a worker thread,
+    pulling chunks from the ASGI stream as they arrive.
+    """
+    chunks = request.stream()
+
+    async def next_chunk():
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    buffer = b""
+    while True:
+        chunk = anyio.from_thread.run(next_chunk)
+        if chunk is None:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8") + "\n"
+    if buffer:
+        yield buffer.decode("utf-8")
+
+@app.post("/admin/books/import")
+async def import_books(request: Request, format: Optional[str] = None, upsert: bool = False, chunk_size: int = 1000, conn=Depends(get_db)):
+    """
+    Bulk import books from a CSV or NDJSON request body (Admin Only).
+    The body is streamed and written in chunks of `chunk_size` rows; with
+    `upsert` existing ISBNs are updated instead of reported as errors, and
+    repeated ISBNs in one chunk keep the last row (the earlier ones are
+    reported under duplicate_rows). Returns counts and per-row errors.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in catalog_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(catalog_import.FORMATS)}")
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 10000")
+
+    importer = catalog_import.CatalogImporter(conn, upsert=upsert, chunk_size=chunk_size)
+    try:
+        report = await run_in_threadpool(importer.run, request_lines(request), format)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Chunks before the bad input are already committed
+        if importer.updated:
+            book_cache.clear()
+            book_titles_changed()
+        tables_changed("Book", "Book_Author")
+        raise HTTPException(status_code=400, detail=(
+            f"Could not parse upload after row {importer.processed} "
+            f"({importer.inserted} inserted, {importer.updated} updated): {e}"
+        ))
+    if report["updated"]:
+        book_cache.clear()
+        book_titles_changed()
+    tables_changed("Book", "Book_Author")
+    return report
+
+def book_query(isbn):
+    return "SELECT * FROM Book WHERE ISBN = %s", (isbn,)
+
+def book_publisher_query(pub_id):
+    return "SELECT name, phone, address FROM Publisher WHERE PubID = %s", (pub_id,)
+
 @app.get("/admin/books/{isbn}")
 def get_book(isbn: str, conn=Depends(get_db)):
     """
     Get book details by ISBN (Admin Only).
+    Served from the book cache when possible.
     """
+    book = book_cache.get(isbn)
+    if book is not None:
+        return copy.deepcopy(book)
+
+    token = book_cache.token()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM Book WHERE ISBN = %s", (isbn,))
+    cursor.execute(*book_query(isbn))
     book = cursor.fetchone()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
     # Get authors
-    cursor.execute("""
-        SELECT a.authorID, a.author_name 
-        FROM Book_Author ba
-        JOIN Author a ON ba.authorID = a.authorID
-        WHERE ba.ISBN = %s
-    """, (isbn,))
-    book['authors'] = cursor.fetchall()
+    book['authors'] = fetch_authors(cursor, [isbn])[isbn]
     
     # Get publisher info
-    cursor.execute("SELECT name, phone, address FROM Publisher WHERE PubID = %s", (book['PubID'],))
+    cursor.execute(*book_publisher_query(book['PubID']))
     publisher = cursor.fetchone()
     if publisher:
         book['publisher'] = publisher
     
+    book_cache.set(isbn, copy.deepcopy(book), token)
     return book
 
-@app.get("/books/{isbn}")
+@app.get("/books/{isbn}", dependencies=[Depends(book_conditional_get)])
 def get_book_details(isbn: str, conn=Depends(get_db)):
     """
     Get book details by ISBN (Public).
@@ -412,6 +1033,10 @@ def update_book(isbn: str, book_update: BookUpdate, conn=Depends(get_db)):
                                  (isbn, author_id))
         
         conn.commit()
+        invalidate_books(isbn)
+        if 'Title' in update_fields:
+            book_titles_changed()
+        tables_changed("Book", "Book_Author")
         return {"message": "Book updated successfully"}
     except mysql.connector.Error as err:
         conn.rollback()
@@ -422,14 +1047,26 @@ def update_book(isbn: str, book_update: BookUpdate, conn=Depends(get_db)):
 
 # 3. PUBLISHER & AUTHOR OPERATIONS
 
-@app.get("/admin/publishers")
-def list_publishers(conn=Depends(get_db)):
+LIST_PUBLISHERS_QUERY = "SELECT * FROM Publisher ORDER BY name"
+LIST_AUTHORS_QUERY = "SELECT authorID, author_name FROM Author ORDER BY author_name"
+LIST_PUBLISHER_ORDERS_QUERY = """
+    SELECT po.orderID, po.orderDate, po.Quantity, po.status,
+           b.ISBN, b.Title, b.threshold, b.StockQuantity,
+           p.PubID, p.name as publisher_name
+    FROM Publisher_Order po
+    JOIN Book b ON po.ISBN = b.ISBN
+    JOIN Publisher p ON po.PubID = p.PubID
+    ORDER BY po.orderDate DESC, po.orderID DESC
+"""
+
+@app.get("/admin/publishers", dependencies=[Depends(conditional_get(("Publisher",), "private, no-cache"))])
+def list_publishers(response: Response, conn=Depends(get_db)):
     """
     List all publishers (Admin Only).
     """
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM Publisher ORDER BY name")
-    return cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.execute(LIST_PUBLISHERS_QUERY)
+    return fastjson.rows_response(cursor, response)
 
 @app.post("/admin/publishers")
 def add_publisher(pub: PublisherCreate, conn=Depends(get_db)):
@@ -443,19 +1080,20 @@ def add_publisher(pub: PublisherCreate, conn=Depends(get_db)):
             (pub.name, pub.phone, pub.address)
         )
         conn.commit()
+        tables_changed("Publisher")
         return {"message": "Success", "id": cursor.lastrowid}
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(err))
 
-@app.get("/admin/authors")
-def list_authors(conn=Depends(get_db)):
+@app.get("/admin/authors", dependencies=[Depends(conditional_get(("Author",), "private, no-cache"))])
+def list_authors(response: Response, conn=Depends(get_db)):
     """
     List all authors (Admin Only).
     """
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT authorID, author_name FROM Author ORDER BY author_name")
-    return cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.execute(LIST_AUTHORS_QUERY)
+    return fastjson.rows_response(cursor, response)
 
 @app.post("/admin/authors")
 def create_author(author: AuthorCreate, conn=Depends(get_db)):
@@ -467,6 +1105,7 @@ def create_author(author: AuthorCreate, conn=Depends(get_db)):
         cursor.execute("INSERT INTO Author (author_name) VALUES (%s)", (author.author_name,))
         author_id = cursor.lastrowid
         conn.commit()
+        tables_changed("Author")
         return {"message": "Author created successfully", "authorID": author_id, "author_name": author.author_name}
     except mysql.connector.Error as err:
         conn.rollback()
@@ -477,18 +1116,9 @@ def list_publisher_orders(conn=Depends(get_db)):
     """
     List all publisher orders (Admin Only).
     """
-    cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT po.orderID, po.orderDate, po.Quantity, po.status,
-               b.ISBN, b.Title, b.threshold, b.StockQuantity,
-               p.PubID, p.name as publisher_name
-        FROM Publisher_Order po
-        JOIN Book b ON po.ISBN = b.ISBN
-        JOIN Publisher p ON po.PubID = p.PubID
-        ORDER BY po.orderDate DESC, po.orderID DESC
-    """
-    cursor.execute(query)
-    return cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.execute(LIST_PUBLISHER_ORDERS_QUERY)
+    return fastjson.rows_response(cursor)
 
 @app.post("/admin/publisher-orders")
 def create_publisher_order(order: PublisherOrderCreate, conn=Depends(get_db)):
@@ -513,12 +1143,30 @@ def create_publisher_order(order: PublisherOrderCreate, conn=Depends(get_db)):
         cursor.execute(query, (order.Quantity, order.PubID, order.ISBN))
         order_id = cursor.lastrowid
         conn.commit()
+        tables_changed("Publisher_Order")
         
         return {"message": "Publisher order created successfully", "orderID": order_id}
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=f"Order creation failed: {str(err)}")
 
+@app.post("/admin/replenishment/run")
+def run_replenishment(dry_run: bool = False, conn=Depends(get_db)):
+    """
+    Plan replenishment for the whole catalog from recent sales and place
+    Pending publisher orders, grouped by publisher (Admin Only).
+    With dry_run the plan is only reported.
+    """
+    try:
+        result = replenishment.run(conn, dry_run=dry_run)
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Replenishment failed: {err}")
+    if "skipped" in result:
+        raise HTTPException(status_code=409, detail=result["skipped"])
+    if not dry_run:
+        tables_changed("Publisher_Order")
+    return result
+
 @app.put("/admin/confirm-order/{orderID}")
 def confirm_publisher_order(orderID: int, conn=Depends(get_db)):
     """
@@ -527,7 +1175,7 @@ def confirm_publisher_order(orderID: int, conn=Depends(get_db)):
     """
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT status FROM Publisher_Order WHERE orderID = %s", (orderID,))
+        cursor.execute("SELECT status, ISBN FROM Publisher_Order WHERE orderID = %s", (orderID,))
         order = cursor.fetchone()
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
@@ -538,55 +1186,253 @@ def confirm_publisher_order(orderID: int, conn=Depends(get_db)):
         # Update status to Confirmed (trigger will add stock)
         cursor.execute("UPDATE Publisher_Order SET status = 'Confirmed' WHERE orderID = %s", (orderID,))
         conn.commit()
+        invalidate_books(order['ISBN'])
+        tables_changed("Publisher_Order", "Book")
         
         return {"message": "Order confirmed. Stock updated via trigger."}
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=f"Order confirmation failed: {str(err)}")
 
+def confirm_trigger_adds_stock(cursor):
+    """
+    True if confirm_order_add_stock still adds stock during a bulk confirm,
+    i.e. the database predates the @bulk_confirm guard.
+    """
+    cursor.execute("""
+        SELECT ACTION_STATEMENT FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = 'confirm_order_add_stock'
+    """)
+    trigger = cursor.fetchone()
+    return trigger is not None and '@bulk_confirm' not in trigger['ACTION_STATEMENT']
+
+def bulk_confirm_query(selection):
+    """
+    Lock the publisher orders a bulk confirm selects, by ID list and/or
+    publisher and order date range.
+    """
+    conditions, params = [], []
+    if selection.orderIDs is not None:
+        if not selection.orderIDs:
+            raise HTTPException(status_code=400, detail="orderIDs cannot be empty")
+        conditions.append(f"orderID IN ({','.join(['%s'] * len(selection.orderIDs))})")
+        params.extend(selection.orderIDs)
+    if selection.PubID is not None:
+        conditions.append("PubID = %s")
+        params.append(selection.PubID)
+    if selection.start:
+        conditions.append("orderDate >= %s")
+        params.append(selection.start)
+    if selection.end:
+        conditions.append("orderDate <= %s")
+        params.append(selection.end)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Provide orderIDs, PubID or a date range")
+    query = f"""
+        SELECT orderID, status, ISBN, Quantity FROM Publisher_Order
+        WHERE {' AND '.join(conditions)}
+        ORDER BY orderID FOR UPDATE
+    """
+    return query, tuple(params)
+
+@app.post("/admin/confirm-orders")
+def confirm_publisher_orders(selection: PublisherOrderBulkConfirm, conn=Depends(get_db)):
+    """
+    Confirm many publisher orders in one transaction (Admin Only).
+    Orders are picked by ID list and/or publisher and order date range;
+    stock is added with one aggregated update per ISBN.
+    """
+    query, params = bulk_confirm_query(selection)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        orders = cursor.fetchall()
+
+        results = []
+        for order in orders:
+            outcome = "already_confirmed" if order['status'] == 'Confirmed' else "confirmed"
+            results.append({"orderID": order['orderID'], "ISBN": order['ISBN'],
+                            "Quantity": order['Quantity'], "outcome": outcome})
+        found = {order['orderID'] for order in orders}
+        for order_id in dict.fromkeys(selection.orderIDs or []):
+            if order_id not in found:
+                results.append({"orderID": order_id, "ISBN": None, "Quantity": None, "outcome": "not_found"})
+
+        pending = [r['orderID'] for r in results if r['outcome'] == "confirmed"]
+        isbns = {r['ISBN'] for r in results if r['outcome'] == "confirmed"}
+        if pending:
+            placeholders = ','.join(['%s'] * len(pending))
+            per_row_trigger = confirm_trigger_adds_stock(cursor)
+            cursor.execute("SET @bulk_confirm = 1")
+            try:
+                cursor.execute(f"UPDATE Publisher_Order SET status = 'Confirmed' WHERE orderID IN ({placeholders})",
+                               tuple(pending))
+            finally:
+                cursor.execute("SET @bulk_confirm = NULL")
+            if not per_row_trigger:
+                cursor.execute(f"""
+                    UPDATE Book b
+                    JOIN (
+                        SELECT ISBN, SUM(Quantity) AS qty
+                        FROM Publisher_Order
+                        WHERE orderID IN ({placeholders})
+                        GROUP BY ISBN
+                    ) po ON b.ISBN = po.ISBN
+                    SET b.StockQuantity = b.StockQuantity + po.qty
+                """, tuple(pending))
+        conn.commit()
+        invalidate_books(*isbns)
+        tables_changed("Publisher_Order", "Book")
+
+        counts = {outcome: sum(1 for r in results if r['outcome'] == outcome)
+                  for outcome in ("confirmed", "already_confirmed", "not_found")}
+        return {**counts, "orders": results}
+    except mysql.connector.Error as err:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=f"Order confirmation failed: {str(err)}")
+
 # 4. SHOPPING CART MANAGEMENT
+def lock_cart_row_query(userID):
+    # Serializes writes to one cart, so two adds of the same item can't
+    # deadlock on the Cart_Item row they both read and then upsert
+    return "SELECT cartID FROM Shopping_Cart WHERE userID = %s FOR UPDATE", (userID,)
+
+def cart_add_query(cart_id, item):
+    """
+    Insert-or-increment a cart item, matching no row when the book is
+    missing or the new quantity would exceed stock.
+    """
+    query = """
+        INSERT INTO Cart_Item (cartID, ISBN, Quantity)
+        SELECT %s, b.ISBN, %s
+        FROM Book b
+        LEFT JOIN Cart_Item cur ON cur.cartID = %s AND cur.ISBN = b.ISBN
+        WHERE b.ISBN = %s
+        AND COALESCE(cur.Quantity, 0) + %s <= b.StockQuantity
+        ON DUPLICATE KEY UPDATE Quantity = Cart_Item.Quantity + %s
+    """
+    return query, (cart_id, item.Quantity, cart_id, item.ISBN, item.Quantity, item.Quantity)
+
+def view_cart_query(userID):
+    query = """
+        SELECT b.Title, b.ISBN, ci.Quantity, b.Price, (ci.Quantity * b.Price) as TotalItemPrice
+        FROM Cart_Item ci
+        JOIN Book b ON ci.ISBN = b.ISBN
+        JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
+        WHERE sc.userID = %s
+    """
+    return query, (userID,)
+
+def cart_remove_query(userID, isbn):
+    query = """
+        DELETE ci FROM Cart_Item ci
+        JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
+        WHERE sc.userID = %s AND ci.ISBN = %s
+    """
+    return query, (userID, isbn)
+
 @app.post("/cart/add")
-def add_to_cart(userID: int, item: CartItemIn, conn=Depends(get_db)):
+def add_to_cart(userID: int, item: CartAddIn, conn=Depends(get_db)):
     """
-    Add books to a shopping cart.
-    Validates stock availability.
+    Add books to a shopping cart (use PUT /cart/items to lower or set a
+    quantity). Validates stock availability.
+    The cart row is locked first; the stock check and the
+    insert-or-increment then run as one statement, and the reason is only
+    looked up when it refuses the change. Quantity is at least 1, so a
+    matching upsert always changes a row.
     """
     cursor = conn.cursor(dictionary=True)
     try:
-        # Check current stock availability
-        cursor.execute("SELECT StockQuantity FROM Book WHERE ISBN = %s", (item.ISBN,))
-        book = cursor.fetchone()
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        
-        current_stock = book['StockQuantity']
-        if current_stock < item.Quantity:
-            raise HTTPException(status_code=400, detail=f"Not enough stock. Only {current_stock} available.")
+        cursor.execute(*lock_cart_row_query(userID))
+        cart = cursor.fetchone()
+        if not cart:
+            raise HTTPException(status_code=404, detail="Cart not found for this user")
+        cursor.execute(*cart_add_query(cart['cartID'], item))
+        if cursor.rowcount == 0:
+            raise cart_add_refusal(cursor, item)
         
-        # Get user's cartID
-        cursor.execute("SELECT cartID FROM Shopping_Cart WHERE userID = %s", (userID,))
+        conn.commit()
+        tables_changed("Cart_Item")
+        return {"message": "Item added to cart"}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except mysql.connector.Error as err:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=str(err))
+
+def cart_add_refusal(cursor, item):
+    """
+    Explain why add_to_cart's upsert matched no row.
+    """
+    cursor.execute("SELECT StockQuantity FROM Book WHERE ISBN = %s", (item.ISBN,))
+    book = cursor.fetchone()
+    if book is None:
+        return HTTPException(status_code=404, detail="Book not found")
+    current_stock = book['StockQuantity']
+    if current_stock < item.Quantity:
+        return HTTPException(status_code=400, detail=f"Not enough stock. Only {current_stock} available.")
+    return HTTPException(status_code=400, detail=f"Cannot add more items. Only {current_stock} available.")
+
+@app.put("/cart/items")
+def set_cart_items(userID: int, batch: CartBatchIn, conn=Depends(get_db)):
+    """
+    Set the quantities of many cart items in one transaction.
+    A Quantity of 0 removes the item; with `replace` every other item is
+    removed too (restoring a saved cart or re-ordering a previous order).
+    Nothing is changed if any item fails validation. The books are locked
+    in ISBN order while their stock is checked, as checkout does, so the
+    quantities written never exceed stock.
+    """
+    quantities = {}
+    for item in batch.items:
+        if item.Quantity < 0:
+            raise HTTPException(status_code=400, detail=f"Quantity for {item.ISBN} cannot be negative")
+        if item.ISBN in quantities:
+            raise HTTPException(status_code=400, detail=f"Duplicate ISBN in request: {item.ISBN}")
+        quantities[item.ISBN] = item.Quantity
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(*lock_cart_row_query(userID))
         cart = cursor.fetchone()
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found for this user")
         cart_id = cart['cartID']
 
-        # Check if book already in cart
-        cursor.execute("SELECT Quantity FROM Cart_Item WHERE cartID = %s AND ISBN = %s", (cart_id, item.ISBN))
-        existing = cursor.fetchone()
-        
-        if existing:
-            new_qty = existing['Quantity'] + item.Quantity
-            # Check if adding this quantity would exceed available stock
-            if new_qty > current_stock:
-                raise HTTPException(status_code=400, detail=f"Cannot add more items. Only {current_stock} available.")
-            cursor.execute("UPDATE Cart_Item SET Quantity = %s WHERE cartID = %s AND ISBN = %s", 
-                           (new_qty, cart_id, item.ISBN))
+        wanted = {isbn: qty for isbn, qty in quantities.items() if qty > 0}
+        if wanted:
+            cursor.execute(*lock_books_query(sorted(wanted)))
+            stock = {row['ISBN']: row['StockQuantity'] for row in cursor.fetchall()}
+            problems = []
+            for isbn, qty in wanted.items():
+                if isbn not in stock:
+                    problems.append(f"{isbn}: book not found")
+                elif qty > stock[isbn]:
+                    problems.append(f"{isbn}: only {stock[isbn]} available")
+            if problems:
+                raise HTTPException(status_code=400, detail="Cart not updated. " + "; ".join(problems))
+
+        if batch.replace:
+            cursor.execute("DELETE FROM Cart_Item WHERE cartID = %s", (cart_id,))
         else:
-            cursor.execute("INSERT INTO Cart_Item (cartID, ISBN, Quantity) VALUES (%s, %s, %s)", 
-                           (cart_id, item.ISBN, item.Quantity))
-        
+            removed = [isbn for isbn, qty in quantities.items() if qty == 0]
+            if removed:
+                placeholders = ','.join(['%s'] * len(removed))
+                cursor.execute(f"DELETE FROM Cart_Item WHERE cartID = %s AND ISBN IN ({placeholders})",
+                               (cart_id, *removed))
+        if wanted:
+            cursor.executemany("""
+                INSERT INTO Cart_Item (cartID, ISBN, Quantity) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity)
+            """, [(cart_id, isbn, qty) for isbn, qty in wanted.items()])
+
         conn.commit()
-        return {"message": "Item added to cart"}
+        tables_changed("Cart_Item")
+        return {"message": "Cart updated", "items": len(wanted)}
+    except HTTPException:
+        conn.rollback()
+        raise
     except mysql.connector.Error as err:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(err))
@@ -597,14 +1443,7 @@ def view_cart(userID: int, conn=Depends(get_db)):
     View items in the cart and total prices.
     """
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT b.Title, b.ISBN, ci.Quantity, b.Price, (ci.Quantity * b.Price) as TotalItemPrice 
-        FROM Cart_Item ci
-        JOIN Book b ON ci.ISBN = b.ISBN
-        JOIN Shopping_Cart sc ON ci.cartID = sc.cartID
-        WHERE sc.userID = %s
-    """
-    cursor.execute(query, (userID,))
+    cursor.execute(*view_cart_query(userID))
     items = cursor.fetchall()
     
     grand_total = sum(i['TotalItemPrice'] for i in items)
@@ -617,156 +1456,388 @@ def remove_from_cart(userID: int, isbn: str, conn=Depends(get_db)):
     """
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT cartID FROM Shopping_Cart WHERE userID = %s", (userID,))
-        cart = cursor.fetchone()
-        if cart:
-            cursor.execute("DELETE FROM Cart_Item WHERE cartID = %s AND ISBN = %s", (cart[0], isbn))
-            conn.commit()
+        cursor.execute(*cart_remove_query(userID, isbn))
+        conn.commit()
+        tables_changed("Cart_Item")
         return {"message": "Item removed from cart"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
 # 5. ORDER PROCESSING (CHECKOUT & CONFIRMATION)
+
+# InnoDB errors that abort a transaction but are safe to retry from scratch
+RETRYABLE_ERRNOS = {1205, 1213}  # lock wait timeout, deadlock
+CHECKOUT_MAX_ATTEMPTS = 4
+
+@job_queue.handler("rollup_order")
+def rollup_order_job(conn, payload):
+    """
+    Add the order to the sales rollups, then queue replenishment for its
+    books, which sizes reorders from the rollup and so must see this sale.
+    """
+    # Committed together with the job's removal from the outbox, so each
+    # order is counted exactly once
+    cursor = conn.cursor()
+    rollups.record_order(cursor, payload["orderID"])
+    if payload.get("isbns"):
+        return [jobs.enqueue(cursor, "replenish", {"isbns": payload["isbns"]})]
+
+@job_queue.handler("replenish")
+def replenish_job(conn, payload):
+    """
+    Reorder the books a sale drew down, sized by their sales velocity.
+    Rerunning is harmless: pending publisher orders count as stock.
+    """
+    result = replenishment.run(conn, isbns=payload["isbns"], lock_timeout=2)
+    if "skipped" in result:
+        raise RuntimeError(result["skipped"])
+    if result["reordered"]:
+        tables_changed("Publisher_Order")
+
+def lock_cart_query(userID):
+    query = """
+        SELECT ci.cartID, ci.ISBN, ci.Quantity
+        FROM Shopping_Cart sc
+        JOIN Cart_Item ci ON ci.cartID = sc.cartID
+        WHERE sc.userID = %s
+        FOR UPDATE
+    """
+    return query, (userID,)
+
+def lock_books_query(isbns):
+    placeholders = ','.join(['%s'] * len(isbns))
+    query = f"""
+        SELECT ISBN, Title, Price, StockQuantity
+        FROM Book
+        WHERE ISBN IN ({placeholders})
+        ORDER BY ISBN
+        FOR UPDATE
+    """
+    return query, tuple(isbns)
+
+def deduct_stock_query(order_id):
+    query = """
+        UPDATE Book b
+        JOIN Customer_Order_Item coi ON coi.ISBN = b.ISBN
+        SET b.StockQuantity = b.StockQuantity - coi.Quantity
+        WHERE coi.orderID = %s
+    """
+    return query, (order_id,)
+
+def place_order(cursor, data):
+    """
+    Run one checkout attempt inside the current transaction.
+    Book rows are locked in ISBN order so concurrent checkouts of the same
+    titles queue up instead of deadlocking, and stock is verified under the
+    lock before anything is written. Returns (orderID, ISBNs, jobs); the
+    jobs are in the outbox and are submitted once the transaction commits.
+    """
+    # 1. Get (and lock) this user's cart items
+    cursor.execute(*lock_cart_query(data.userID))
+    items = cursor.fetchall()
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    # 2. Lock the books in a deterministic order and check stock
+    isbns = sorted(item['ISBN'] for item in items)
+    cursor.execute(*lock_books_query(isbns))
+    books = {book['ISBN']: book for book in cursor.fetchall()}
+
+    shortages = []
+    for item in sorted(items, key=lambda i: i['ISBN']):
+        book = books.get(item['ISBN'])
+        available = book['StockQuantity'] if book else 0
+        if item['Quantity'] > available:
+            title = f" ({book['Title']})" if book else ""
+            shortages.append(f"{item['ISBN']}{title}: requested {item['Quantity']}, available {available}")
+    if shortages:
+        raise HTTPException(status_code=409, detail="Not enough stock for " + "; ".join(shortages))
+
+    total_price = sum(item['Quantity'] * books[item['ISBN']]['Price'] for item in items)
+
+    # 3. Insert Order directly as 'Completed'; stock is deducted below in
+    #    one statement instead of by the deduct_on_completion trigger
+    #    (which only fires on a Pending -> Completed update)
+    cursor.execute("""
+        INSERT INTO Customer_Order (orderDate, totalPrice, status, card_number, card_expiry, userID) 
+        VALUES (CURDATE(), %s, 'Completed', %s, %s, %s)
+    """, (total_price, data.card_number, data.card_expiry, data.userID))
+    order_id = cursor.lastrowid
+
+    # 4. Transfer items to Order_Item table (sent as one multi-row INSERT)
+    cursor.executemany("""
+        INSERT INTO Customer_Order_Item (orderID, ISBN, Quantity, Price_at_purchase) 
+        VALUES (%s, %s, %s, %s)
+    """, [(order_id, item['ISBN'], item['Quantity'], books[item['ISBN']]['Price']) for item in items])
+
+    # 5. Deduct stock for every item at once; the per-row Book trigger
+    #    (prevent_negative_stock) still fires
+    cursor.execute(*deduct_stock_query(order_id))
+
+    # 6. Clear Cart
+    cursor.execute("DELETE FROM Cart_Item WHERE cartID = %s", (items[0]['cartID'],))
+
+    # 7. Queue the follow-up work: the rollup upserts (hot rows shared by
+    #    every checkout) run after the response and then queue
+    #    replenishment, which reads the rollup
+    order_jobs = [jobs.enqueue(cursor, "rollup_order", {"orderID": order_id, "isbns": isbns})]
+    return order_id, isbns, order_jobs
+
 @app.post("/customer/checkout")
 def checkout(data: CheckoutIn, conn=Depends(get_db)):
     """
     Check out a shopping cart.
+    Uses a fixed number of statements regardless of cart size, fails with
+    409 and a per-ISBN message when stock is short, and retries deadlocks.
     """
     cursor = conn.cursor(dictionary=True)
-    try:
-        # 1. Get Cart Items
-        cursor.execute("""
-            SELECT ci.*, b.Price, b.Title, b.StockQuantity 
-            FROM Cart_Item ci 
-            JOIN Book b ON ci.ISBN = b.ISBN 
-            JOIN Shopping_Cart sc ON ci.cartID = sc.cartID 
-            WHERE sc.userID = %s
-        """, (data.userID,))
-        items = cursor.fetchall()
-        
-        if not items:
-            raise HTTPException(status_code=400, detail="Cart is empty")
-
-        total_price = sum(item['Quantity'] * item['Price'] for item in items)
+    for attempt in range(1, CHECKOUT_MAX_ATTEMPTS + 1):
+        try:
+            order_id, isbns, order_jobs = place_order(cursor, data)
+            conn.commit()
+            break
+        except HTTPException:
+            conn.rollback()
+            raise
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno in RETRYABLE_ERRNOS and attempt < CHECKOUT_MAX_ATTEMPTS:
+                # Back off with jitter so the retried transactions don't collide again
+                time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+                continue
+            raise HTTPException(status_code=400, detail=f"Transaction failed: {str(err)}")
+        except Exception as e:
+            conn.rollback()
+            raise HTTPException(status_code=400, detail=f"Transaction failed: {str(e)}")
 
-        # 2. Insert Order as 'Pending' first
-        cursor.execute("""
-            INSERT INTO Customer_Order (orderDate, totalPrice, status, card_number, card_expiry, userID) 
-            VALUES (CURDATE(), %s, 'Pending', %s, %s, %s)
-        """, (total_price, data.card_number, data.card_expiry, data.userID))
-        order_id = cursor.lastrowid
+    invalidate_books(*isbns)
+    tables_changed("Book", "Cart_Item", "Customer_Order", "Customer_Order_Item")
+    job_queue.submit(*order_jobs)
+    return {"message": "Checkout successful", "orderID": order_id}
 
-        # 3. Transfer items to Order_Item table
-        for item in items:
-            cursor.execute("""
-                INSERT INTO Customer_Order_Item (orderID, ISBN, Quantity, Price_at_purchase) 
-                VALUES (%s, %s, %s, %s)
-            """, (order_id, item['ISBN'], item['Quantity'], item['Price']))
+ORDER_HISTORY_DEFAULT_PAGE_SIZE = 20
+ORDER_HISTORY_MAX_PAGE_SIZE = 100
 
-        # 4. TRIGGER EVENT: Update status to 'Completed' to deduct stock via DB trigger
-        cursor.execute("UPDATE Customer_Order SET status = 'Completed' WHERE orderID = %s", (order_id,))
+# Line items of completed orders never change, so they are cached by orderID.
+# They carry the book's current Title, though: every write path that can
+# rename a book must call book_titles_changed().
+order_items_cache = TTLCache(maxsize=50000, ttl=3600)
 
-        # 5. Clear Cart
-        cursor.execute("DELETE FROM Cart_Item WHERE cartID = %s", (items[0]['cartID'],))
-        
-        conn.commit()
-        return {"message": "Checkout successful", "orderID": order_id}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=400, detail=f"Transaction failed: {str(e)}")
+def book_titles_changed():
+    # Renames are rare admin writes; no per-ISBN index is kept for them
+    order_items_cache.clear()
 
-@app.get("/customer/orders/{userID}")
-def view_past_orders(userID: int, conn=Depends(get_db)):
+def order_history_query(userID, cursor, limit):
     """
-    View past orders in detail.
+    One page of a user's orders, newest first, keyset-paginated on
+    (orderDate, orderID); fetches one extra row to detect a next page.
+    idx_order_user_date ends in the primary key, so both the range and the
+    order come from the index.
     """
-    cursor = conn.cursor(dictionary=True)
+    if not 1 <= limit <= ORDER_HISTORY_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {ORDER_HISTORY_MAX_PAGE_SIZE}")
     query = """
-        SELECT co.orderID, co.orderDate, co.totalPrice, co.status,
-               GROUP_CONCAT(CONCAT(b.Title, ' (x', coi.Quantity, ')') SEPARATOR ', ') as items
-        FROM Customer_Order co
-        JOIN Customer_Order_Item coi ON co.orderID = coi.orderID
+        SELECT orderID, orderDate, totalPrice, status
+        FROM Customer_Order
+        WHERE userID = %s
+    """
+    params = [userID]
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, (str, int))
+        query += " AND (orderDate < %s OR (orderDate = %s AND orderID < %s))"
+        params.extend([last_date, last_date, last_id])
+    query += " ORDER BY orderDate DESC, orderID DESC LIMIT %s"
+    params.append(limit + 1)
+    return query, tuple(params)
+
+def order_items_query(orderIDs):
+    placeholders = ','.join(['%s'] * len(orderIDs))
+    query = f"""
+        SELECT coi.orderID, coi.ISBN, b.Title, coi.Quantity, coi.Price_at_purchase
+        FROM Customer_Order_Item coi
         JOIN Book b ON coi.ISBN = b.ISBN
-        WHERE co.userID = %s
-        GROUP BY co.orderID
-        ORDER BY co.orderDate DESC
+        WHERE coi.orderID IN ({placeholders})
+        ORDER BY coi.orderID, coi.ISBN
     """
-    cursor.execute(query, (userID,))
-    results = cursor.fetchall()
-    return results
+    return query, tuple(orderIDs)
+
+@app.get("/customer/orders/{userID}")
+def view_past_orders(userID: int, response: Response, limit: int = ORDER_HISTORY_DEFAULT_PAGE_SIZE,
+                     cursor: Optional[str] = None, conn=Depends(get_db)):
+    """
+    View past orders in detail, newest first, each with its line items.
+    Paginated by keyset: pass the X-Next-Cursor response header back as
+    `cursor` for the next page. At most two queries per page.
+    """
+    db_cursor = conn.cursor(dictionary=True)
+    db_cursor.execute(*order_history_query(userID, cursor, limit))
+    orders = db_cursor.fetchall()
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last['orderDate'], last['orderID']])
+
+    items = {}
+    for order in orders:
+        if order['status'] == 'Completed':
+            cached = order_items_cache.get(order['orderID'])
+            if cached is not None:
+                items[order['orderID']] = cached
+    missing = [order['orderID'] for order in orders if order['orderID'] not in items]
+    if missing:
+        for orderID in missing:
+            items[orderID] = []
+        db_cursor.execute(*order_items_query(missing))
+        for row in db_cursor.fetchall():
+            items[row.pop('orderID')].append(row)
+        for order in orders:
+            if order['status'] == 'Completed' and order['orderID'] in missing:
+                order_items_cache.set(order['orderID'], items[order['orderID']])
+
+    for order in orders:
+        order['items'] = items[order['orderID']]
+    return fastjson.json_response(orders, response)
 
 # 6. SYSTEM REPORTS (ADMIN ONLY)
+# Sales reports read the rollup tables maintained by checkout's jobs (see rollups.py),
+# so their cost does not grow with the order history.
+PREV_MONTH_SALES_QUERY = """
+    SELECT SUM(totalSales) as TotalSalesPrevMonth
+    FROM Sales_Daily
+    WHERE salesDate >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+    AND salesDate < DATE_FORMAT(CURDATE(), '%Y-%m-01')
+"""
+TOP_CUSTOMERS_QUERY = """
+    SELECT u.username, s.totalSpent as TotalSpent
+    FROM Sales_User_Total s
+    JOIN user u ON s.userID = u.userID
+    ORDER BY s.totalSpent DESC
+    LIMIT 5
+"""
+TOP_SELLING_BOOKS_QUERY = """
+    SELECT b.Title, b.ISBN, s.TotalCopiesSold
+    FROM (
+        SELECT ISBN, SUM(unitsSold) as TotalCopiesSold
+        FROM Sales_Book_Daily
+        WHERE salesDate >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
+        GROUP BY ISBN
+        ORDER BY TotalCopiesSold DESC
+        LIMIT 10
+    ) s
+    JOIN Book b ON s.ISBN = b.ISBN
+    ORDER BY s.TotalCopiesSold DESC
+"""
+
+def daily_sales_query(day):
+    return "SELECT SUM(totalSales) as DailyTotal FROM Sales_Daily WHERE salesDate = %s", (day,)
+
 @app.get("/admin/reports/sales-prev-month")
-def report_prev_month_sales(conn=Depends(get_db)):
+def report_prev_month_sales(conn=Depends(get_read_db)):
     """
     Report (a): The total sales for books in the previous month.
     """
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT SUM(totalPrice) as TotalSalesPrevMonth 
-        FROM Customer_Order 
-        WHERE MONTH(orderDate) = MONTH(CURDATE() - INTERVAL 1 MONTH) 
-        AND YEAR(orderDate) = YEAR(CURDATE() - INTERVAL 1 MONTH)
-        AND status = 'Completed'
-    """
-    cursor.execute(query)
+    cursor.execute(PREV_MONTH_SALES_QUERY)
     return cursor.fetchone()
 
 @app.get("/admin/reports/sales-daily")
-def report_daily_sales(date_input: str, conn=Depends(get_db)):
+def report_daily_sales(date_input: str, conn=Depends(get_read_db)):
     """
     Report (b): The total sales for books on a certain day.
     """
     cursor = conn.cursor(dictionary=True)
-    query = "SELECT SUM(totalPrice) as DailyTotal FROM Customer_Order WHERE orderDate = %s AND status = 'Completed'"
-    cursor.execute(query, (date_input,))
+    cursor.execute(*daily_sales_query(date_input))
     return cursor.fetchone()
 
 @app.get("/admin/reports/top-customers")
-def report_top_customers(conn=Depends(get_db)):
+def report_top_customers(conn=Depends(get_read_db)):
     """
     Report (c): Top 5 Customers (Lifetime).
     """
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT u.username, SUM(co.totalPrice) as TotalSpent 
-        FROM Customer_Order co 
-        JOIN user u ON co.userID = u.userID 
-        WHERE co.status = 'Completed'
-        GROUP BY u.userID 
-        ORDER BY TotalSpent DESC 
-        LIMIT 5
-    """
-    cursor.execute(query)
+    cursor.execute(TOP_CUSTOMERS_QUERY)
     return cursor.fetchall()
 
 @app.get("/admin/reports/top-selling-books")
-def report_top_selling_books(conn=Depends(get_db)):
+def report_top_selling_books(conn=Depends(get_read_db)):
     """
     Report (d): Top 10 Selling Books (Last 3 Months).
     """
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT b.Title, b.ISBN, SUM(coi.Quantity) as TotalCopiesSold
-        FROM Customer_Order_Item coi
-        JOIN Customer_Order co ON coi.orderID = co.orderID
-        JOIN Book b ON coi.ISBN = b.ISBN
-        WHERE co.orderDate >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
-        AND co.status = 'Completed'
-        GROUP BY b.ISBN
-        ORDER BY TotalCopiesSold DESC
-        LIMIT 10
-    """
-    cursor.execute(query)
+    cursor.execute(TOP_SELLING_BOOKS_QUERY)
     return cursor.fetchall()
 
-@app.get("/admin/reports/book-replenishments")
-def report_book_replenishments(isbn: str, conn=Depends(get_db)):
-    """
-    Report (e): Total Number of Times a Specific Book Has Been Ordered (Replenishment).
-    """
+SALES_TIME_BUCKETS = {
+    "day": "co.orderDate",
+    "week": "co.orderDate - INTERVAL WEEKDAY(co.orderDate) DAY",        # Monday
+    "month": "co.orderDate - INTERVAL (DAYOFMONTH(co.orderDate) - 1) DAY",  # 1st of month
+}
+SALES_GROUP_BUCKETS = {
+    "category": ("b.category", ""),
+    "publisher": ("p.name", " JOIN Publisher p ON b.PubID = p.PubID"),
+}
+
+def sales_report_query(start, end, bucket):
+    """
+    Completed sales from start to end (inclusive) grouped by `bucket`, a
+    key of SALES_TIME_BUCKETS or SALES_GROUP_BUCKETS.
+    """
+    params = (start, end + timedelta(days=1))
+    if bucket in SALES_TIME_BUCKETS:
+        query = f"""
+            SELECT {SALES_TIME_BUCKETS[bucket]} as bucket,
+                   SUM(co.totalPrice) as totalSales, COUNT(*) as orderCount
+            FROM Customer_Order co
+            WHERE co.status = 'Completed'
+            AND co.orderDate >= %s AND co.orderDate < %s
+            GROUP BY bucket
+            ORDER BY bucket
+        """
+    else:
+        bucket_expr, join = SALES_GROUP_BUCKETS[bucket]
+        query = f"""
+            SELECT {bucket_expr} as bucket,
+                   SUM(coi.Quantity * coi.Price_at_purchase) as totalSales,
+                   SUM(coi.Quantity) as unitsSold,
+                   COUNT(DISTINCT co.orderID) as orderCount
+            FROM Customer_Order co
+            JOIN Customer_Order_Item coi ON coi.orderID = co.orderID
+            JOIN Book b ON coi.ISBN = b.ISBN{join}
+            WHERE co.status = 'Completed'
+            AND co.orderDate >= %s AND co.orderDate < %s
+            GROUP BY bucket
+            ORDER BY totalSales DESC
+        """
+    return query, params
+
+@app.get("/admin/reports/sales")
+def report_sales(start: date, end: date, bucket: str = "day", conn=Depends(get_read_db)):
+    """
+    Completed sales between two dates (inclusive), grouped by day, week,
+    month, category or publisher.
+    Uses plain range predicates on orderDate so the (status, orderDate)
+    index answers the whole range in one scan.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    valid_buckets = list(SALES_TIME_BUCKETS) + list(SALES_GROUP_BUCKETS)
+    if bucket not in valid_buckets:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket. Must be one of: {', '.join(valid_buckets)}")
+
     cursor = conn.cursor(dictionary=True)
+    cursor.execute(*sales_report_query(start, end, bucket))
+    rows = cursor.fetchall()
+    return {
+        "start": start,
+        "end": end,
+        "bucket": bucket,
+        "totalSales": sum(row['totalSales'] for row in rows),
+        "rows": rows,
+    }
+
+def book_replenishments_query(isbn):
     query = """
         SELECT b.Title, COUNT(*) as ReplenishmentOrderCount, SUM(po.Quantity) as TotalRestocked
         FROM Publisher_Order po
@@ -774,19 +1845,28 @@ def report_book_replenishments(isbn: str, conn=Depends(get_db)):
         WHERE po.ISBN = %s
         GROUP BY po.ISBN
     """
-    cursor.execute(query, (isbn,))
+    return query, (isbn,)
+
+@app.get("/admin/reports/book-replenishments")
+def report_book_replenishments(isbn: str, conn=Depends(get_read_db)):
+    """
+    Report (e): Total Number of Times a Specific Book Has Been Ordered (Replenishment).
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(*book_replenishments_query(isbn))
     return cursor.fetchone()
 
 # 7. ADMIN USER MANAGEMENT
+LIST_USERS_QUERY = "SELECT userID, username, first_name, last_name, email, Role FROM user ORDER BY userID"
+
 @app.get("/admin/users")
 def list_all_users(conn=Depends(get_db)):
     """
     List all users (Admin Only).
     """
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT userID, username, first_name, last_name, email, Role FROM user ORDER BY userID"
-    cursor.execute(query)
-    return cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.execute(LIST_USERS_QUERY)
+    return fastjson.rows_response(cursor)
 
 @app.put("/admin/users/{userID}/promote")
 def promote_user_to_admin(userID: int, conn=Depends(get_db)):
@@ -806,7 +1886,174 @@ def promote_user_to_admin(userID: int, conn=Depends(get_db)):
         # Update role to Admin
         cursor.execute("UPDATE user SET Role = 'Admin' WHERE userID = %s", (userID,))
         conn.commit()
+        tables_changed("user")
         return {"message": f"User {userID} has been promoted to Admin"}
     except mysql.connector.Error as err:
         conn.rollback()
-        raise HTTPException(status_code=400, detail=str(err))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(err))
+
+# 8. DATA EXPORTS (ADMIN ONLY)
+# Full-table dumps are streamed from an unbuffered server-side cursor in
+# chunks, so memory stays flat however many rows the table has.
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def encode_export_rows(rows, columns, fmt, header=False):
+    if fmt == "ndjson":
+        return ''.join(json.dumps(row, default=json_default) + '\n' for row in rows)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([row[column] for column in columns] for row in rows)
+    return out.getvalue()
+
+def export_response(query, params, columns, fmt, name):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    def generate():
+        if fmt == "csv":
+            yield encode_export_rows([], columns, fmt, header=True)
+        for rows in stream_query(query, params, size=2000, replica=True):
+            yield encode_export_rows(rows, columns, fmt)
+
+    return StreamingResponse(generate(), media_type=EXPORT_FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+    })
+
+def export_filters(alias, start, end, since_orderID):
+    """
+    Date-range and incremental "orders after this ID" predicates.
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{alias}.orderDate >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{alias}.orderDate < %s")
+        params.append(end + timedelta(days=1))
+    if since_orderID is not None:
+        conditions.append(f"{alias}.orderID > %s")
+        params.append(since_orderID)
+    where = " AND ".join(conditions) if conditions else "1=1"
+    return where, params
+
+def export_books_query():
+    """
+    (query, params, columns) for each export; the orders exports take
+    export_filters' arguments.
+    """
+    columns = ["ISBN", "Title", "pubYear", "Price", "StockQuantity", "threshold", "category", "PubID"]
+    return f"SELECT {', '.join(columns)} FROM Book ORDER BY ISBN", (), columns
+
+def export_customer_orders_query(start=None, end=None, since_orderID=None):
+    columns = ["orderID", "orderDate", "userID", "status", "totalPrice", "ISBN", "Quantity", "Price_at_purchase"]
+    where, params = export_filters("co", start, end, since_orderID)
+    query = f"""
+        SELECT co.orderID, co.orderDate, co.userID, co.status, co.totalPrice,
+               coi.ISBN, coi.Quantity, coi.Price_at_purchase
+        FROM Customer_Order co
+        JOIN Customer_Order_Item coi ON coi.orderID = co.orderID
+        WHERE {where}
+        ORDER BY co.orderID, coi.ISBN
+    """
+    return query, tuple(params), columns
+
+def export_publisher_orders_query(start=None, end=None, since_orderID=None):
+    columns = ["orderID", "orderDate", "Quantity", "status", "PubID", "ISBN"]
+    where, params = export_filters("po", start, end, since_orderID)
+    query = f"""
+        SELECT {', '.join('po.' + column for column in columns)}
+        FROM Publisher_Order po
+        WHERE {where}
+        ORDER BY po.orderID
+    """
+    return query, tuple(params), columns
+
+@app.get("/admin/export/books")
+def export_books(format: str = "csv"):
+    """
+    Stream the whole catalog as CSV or NDJSON (Admin Only).
+    """
+    return export_response(*export_books_query(), format, "books")
+
+@app.get("/admin/export/customer-orders")
+def export_customer_orders(format: str = "csv", start: Optional[date] = None, end: Optional[date] = None, since_orderID: Optional[int] = None):
+    """
+    Stream customer orders, one row per order item (Admin Only).
+    Filter by order date range (inclusive) and/or orders after `since_orderID`.
+    """
+    return export_response(*export_customer_orders_query(start, end, since_orderID), format, "customer-orders")
+
+@app.get("/admin/export/publisher-orders")
+def export_publisher_orders(format: str = "csv", start: Optional[date] = None, end: Optional[date] = None, since_orderID: Optional[int] = None):
+    """
+    Stream publisher replenishment orders (Admin Only).
+    Filter by order date range (inclusive) and/or orders after `since_orderID`.
+    """
+    return export_response(*export_publisher_orders_query(start, end, since_orderID), format, "publisher-orders")
+
+@app.get("/admin/db-pool")
+def db_pool_stats():
+    """
+    Connection pool usage and saturation counters (Admin Only), plus the
+    lag, health and pool of each read replica.
+    """
+    return {**db_pool.stats(), "replicas": replica_set.stats()}
+
+@app.get("/admin/cache")
+def cache_stats():
+    """
+    Cache sizes and hit/miss/eviction counters (Admin Only).
+    """
+    return {"books": book_cache.stats(), "order_items": order_items_cache.stats(),
+            "table_versions": table_versions.stats()}
+
+@app.get("/admin/jobs")
+def job_stats(conn=Depends(get_db)):
+    """
+    Background job queue depth in this process and outbox rows by status,
+    with the most recent failures (Admin Only).
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT jobID, kind, payload, attempts, createdAt, lastError
+        FROM Job_Outbox
+        WHERE status = 'Failed'
+        ORDER BY jobID DESC
+        LIMIT 20
+    """)
+    failed = cursor.fetchall()
+    return {**job_queue.stats(), "outbox": jobs.outbox_stats(conn.cursor()), "failed": failed}
+
+def collect_pool_and_cache_metrics():
+    pool = db_pool.stats()
+    connections = metrics.Gauge("bookstore_db_pool_connections", "Pooled database connections by state.", ("state",))
+    for state in ("open", "idle", "in_use", "waiting"):
+        connections.set(state, value=pool[state])
+    timeouts = metrics.Counter("bookstore_db_pool_timeouts_total", "Connection checkouts that timed out.")
+    timeouts.inc(amount=pool["timeouts"])
+    lookups = metrics.Counter("bookstore_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+    for name, cache in (("books", book_cache), ("order_items", order_items_cache)):
+        counts = cache.stats()
+        lookups.inc(name, "hit", amount=counts["hits"])
+        lookups.inc(name, "miss", amount=counts["misses"])
+    return [connections, timeouts, lookups]
+
+metrics.registry.add_collector(collect_pool_and_cache_metrics)
+metrics.registry.add_collector(job_queue.collect_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Request, database and pool metrics in Prometheus text format.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/debug/sql")
+def debug_sql(limit: int = 20):
+    """
+    Recent request SQL traces, slow statements with their EXPLAIN plans,
+    suspected N+1 requests and the most expensive statements (Admin Only).
+    """
+    return sqltrace.snapshot(limit)
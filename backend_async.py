@@ -0,0 +1,177 @@
+"""
+Async mode for the bookstore API.
+
+Run with `uvicorn backend_async:app` instead of `uvicorn backend:app`.
+The hot catalog read routes below are `async def` and talk to MySQL through
+an aiomysql connection pool, so in-flight requests no longer each hold one
+of Starlette's threadpool threads. Every other route is served unchanged by
+the sync app in backend.py, which is mounted underneath.
+
+Only the catalog reads are ported, on purpose. They are the public,
+high-concurrency path and each request holds a connection only briefly.
+They also need nothing from the sync stack beyond the shared query builders
+and cache.
+
+The remaining routes stay sync, for three reasons:
+- Cart, checkout and admin writes are transactions built on the sync
+  ConnectionPool: rollback on release, deadlock retries, FOR UPDATE lock
+  ordering and outbox jobs submitted after commit. The job workers share
+  that pool and code.
+- Reports and exports are low-traffic admin reads. They are routed to the
+  read replicas through the sync replica set.
+- A second aiomysql copy of those paths would have to be kept in step with
+  backend.py for no throughput gain. Their concurrency is bounded by row
+  locks and the database, not by threadpool threads.
+"""
+import copy
+import os
+import time
+from typing import Optional
+
+import aiomysql
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+import backend
+import fastjson
+import metrics
+from backend import (
+    SEARCH_DEFAULT_PAGE_SIZE, apply_available_stock, authors_query, book_cache,
+    book_publisher_query, book_query, cart_quantities_query, encode_search_rows, finish_search_page, group_authors,
+    search_page_query, search_stream_query,
+)
+
+# The sync app serves /docs for the full API
+app = FastAPI(title="Bookstore System - Alexandria University (async)",
+              docs_url=None, redoc_url=None, openapi_url=None)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=backend.origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+app.add_middleware(fastjson.CompressionMiddleware,
+                   minimum_size=int(os.environ.get("BOOKSTORE_GZIP_MIN_BYTES", "1024")))
+app.add_middleware(metrics.MetricsMiddleware)
+
+# --- Async Database Pool ---
+# Read-only routes use autocommit so connections go back to the pool
+# without an open transaction
+async_pool_config = {
+    "minsize": 10,
+    "maxsize": 100,
+    "pool_recycle": 3600,
+}
+
+db = {"pool": None}
+
+@app.on_event("startup")
+async def open_async_pool():
+    cfg = backend.db_config
+    db["pool"] = await aiomysql.create_pool(
+        host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"],
+        db=cfg["database"], autocommit=True, **async_pool_config,
+    )
+    # Mounted apps get no startup events; the sync routes' replicas and
+    # job workers are started here
+    await run_in_threadpool(backend.start_replica_monitor)
+    backend.start_job_workers()
+
+@app.on_event("shutdown")
+async def close_pools():
+    db["pool"].close()
+    await db["pool"].wait_closed()
+    backend.close_db_pool()
+
+async def fetch_all(cursor, query, params=()):
+    start = time.perf_counter()
+    try:
+        await cursor.execute(query, params)
+        return list(await cursor.fetchall())
+    finally:
+        metrics.record_query(time.perf_counter() - start)
+
+# --- Async Routes ---
+
+@app.get("/books/search", dependencies=[Depends(backend.search_conditional_get)])
+async def search_books(response: Response, title: Optional[str] = None, category: Optional[str] = None, isbn: Optional[str] = None, author: Optional[str] = None, userID: Optional[int] = None,
+                       q: Optional[str] = None, sort: Optional[str] = None, desc: bool = False, limit: int = SEARCH_DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                       format: str = "json"):
+    """
+    Async version of backend.search_books (same parameters and responses).
+    """
+    if sort is None:
+        sort = "relevance" if q is not None else "title"
+    if format == "ndjson":
+        query, params = search_stream_query(title, category, isbn, author, userID, sort, desc, cursor, q)
+        return StreamingResponse(stream_search_results(query, params), media_type="application/x-ndjson")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="Invalid format. Must be one of: json, ndjson")
+
+    query, params, sort_col = search_page_query(title, category, isbn, author, sort, desc, cursor, q, limit)
+    async with db["pool"].acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as db_cursor:
+            books = finish_search_page(response, await fetch_all(db_cursor, query, params), limit, sort, sort_col)
+            isbns = [book['ISBN'] for book in books]
+            if isbns:
+                authors = group_authors(await fetch_all(db_cursor, *authors_query(isbns)), isbns)
+                for book in books:
+                    book['authors'] = authors[book['ISBN']]
+                if userID:
+                    rows = await fetch_all(db_cursor, *cart_quantities_query(userID, isbns))
+                    apply_available_stock(books, {row['ISBN']: row['Quantity'] for row in rows})
+    return fastjson.json_response(books, response)
+
+async def stream_search_results(query, params, size=500):
+    """
+    Stream NDJSON from an unbuffered (server-side) aiomysql cursor.
+    """
+    async with db["pool"].acquire() as conn:
+        async with conn.cursor(aiomysql.SSDictCursor) as db_cursor:
+            start = time.perf_counter()
+            await db_cursor.execute(query, params)
+            metrics.record_query(time.perf_counter() - start)
+            while True:
+                rows = await db_cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield encode_search_rows(list(rows))
+
+@app.get("/admin/books/{isbn}")
+async def get_book(isbn: str):
+    """
+    Async version of backend.get_book (shares its cache).
+    """
+    book = book_cache.get(isbn)
+    if book is not None:
+        return copy.deepcopy(book)
+
+    token = book_cache.token()
+    async with db["pool"].acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as db_cursor:
+            rows = await fetch_all(db_cursor, *book_query(isbn))
+            if not rows:
+                raise HTTPException(status_code=404, detail="Book not found")
+            book = rows[0]
+            book['authors'] = group_authors(await fetch_all(db_cursor, *authors_query([isbn])), [isbn])[isbn]
+            rows = await fetch_all(db_cursor, *book_publisher_query(book['PubID']))
+            if rows:
+                book['publisher'] = rows[0]
+
+    book_cache.set(isbn, copy.deepcopy(book), token)
+    return book
+
+@app.get("/books/{isbn}", dependencies=[Depends(backend.book_conditional_get)])
+async def get_book_details(isbn: str):
+    """
+    Async version of backend.get_book_details.
+    """
+    return await get_book(isbn)
+
+# Everything else falls through to the sync routes
+app.mount("/", backend.app)
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the bookstore backend.
+Run modules from the project root, e.g. `python -m benchmarks.search`.
+"""
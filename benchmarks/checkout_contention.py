@@ -0,0 +1,140 @@
+"""
+Fire hundreds of parallel checkouts at a few hot ISBNs and check that
+nothing is oversold.
+
+Needs a running backend and writes to its database, so point it at a
+disposable instance. It creates throwaway customers, fills their carts,
+releases every checkout at once, then verifies that the stock that left
+each book equals what the successful orders bought. Created users and
+orders are removed afterwards and the original stock is restored.
+
+    python -m benchmarks.checkout_contention --customers 300 --isbns 978-E4 978-E3 --stock 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import mysql.connector
+
+from backend import db_config
+from benchmarks.httpclient import Connection
+from benchmarks.load import summarize
+
+
+async def prepare_customer(host, port, run_id, index, isbns, max_qty):
+    conn = Connection(host, port)
+    try:
+        name = f"bench_{run_id}_{index}"
+        status, _, body = await conn.request("POST", "/customer/signup", {
+            "username": name, "password": "bench", "first_name": "Bench", "last_name": str(index),
+            "email": f"{name}@bench.invalid", "phone": "000", "address": "bench",
+        })
+        if status != 200:
+            raise RuntimeError(f"Signup failed: {body[:200]!r}")
+        user_id = json.loads(body)["userID"]
+        for isbn in random.sample(isbns, k=random.randint(1, len(isbns))):
+            status, _, body = await conn.request(
+                "POST", f"/cart/add?userID={user_id}", {"ISBN": isbn, "Quantity": random.randint(1, max_qty)}
+            )
+            if status != 200:
+                raise RuntimeError(f"Add to cart failed: {body[:200]!r}")
+        return user_id, conn
+    except BaseException:
+        await conn.close()
+        raise
+
+
+async def fire(customers, start_event):
+    async def checkout(user_id, conn):
+        await start_event.wait()
+        t0 = time.perf_counter()
+        try:
+            status, _, body = await conn.request("POST", "/customer/checkout", {
+                "userID": user_id, "card_number": "4111111111111111", "card_expiry": "2030-01-01",
+            })
+        finally:
+            await conn.close()
+        return status, body, time.perf_counter() - t0
+
+    tasks = [asyncio.create_task(checkout(user_id, conn)) for user_id, conn in customers]
+    await asyncio.sleep(0.1)
+    start = time.perf_counter()
+    start_event.set()
+    results = await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+async def run(args, run_id):
+    customers = await asyncio.gather(*(
+        prepare_customer(args.host, args.port, run_id, i, args.isbns, args.max_qty) for i in range(args.customers)
+    ))
+    return await fire(customers, asyncio.Event())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--customers", type=int, default=300)
+    parser.add_argument("--isbns", nargs="+", default=["978-E4", "978-E3"])
+    parser.add_argument("--stock", type=int, default=100, help="Stock each hot ISBN starts with")
+    parser.add_argument("--max-qty", type=int, default=3)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    db = mysql.connector.connect(**db_config)
+    cursor = db.cursor()
+    placeholders = ','.join(['%s'] * len(args.isbns))
+    cursor.execute(f"SELECT ISBN, StockQuantity FROM Book WHERE ISBN IN ({placeholders})", tuple(args.isbns))
+    original_stock = dict(cursor.fetchall())
+    cursor.execute("SELECT COALESCE(MAX(orderID), 0) FROM Publisher_Order")
+    last_publisher_order = cursor.fetchone()[0]
+    cursor.execute(f"UPDATE Book SET StockQuantity = %s WHERE ISBN IN ({placeholders})", (args.stock, *args.isbns))
+    db.commit()
+
+    try:
+        results, elapsed = asyncio.run(run(args, run_id))
+
+        order_ids = [json.loads(body)["orderID"] for status, body, _ in results if status == 200]
+        sold = {isbn: 0 for isbn in args.isbns}
+        if order_ids:
+            cursor.execute(f"""
+                SELECT ISBN, SUM(Quantity) FROM Customer_Order_Item
+                WHERE orderID IN ({','.join(['%s'] * len(order_ids))}) GROUP BY ISBN
+            """, tuple(order_ids))
+            sold.update({isbn: int(qty) for isbn, qty in cursor.fetchall()})
+        db.commit()
+        cursor.execute(f"SELECT ISBN, StockQuantity FROM Book WHERE ISBN IN ({placeholders})", tuple(args.isbns))
+        final_stock = dict(cursor.fetchall())
+        # Confirmed replenishments are not part of the run, so stock can only move by sales
+        consistent = all(args.stock - sold[isbn] == final_stock[isbn] for isbn in args.isbns)
+
+        statuses = {}
+        for status, _, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report = {
+            "customers": args.customers,
+            "isbns": args.isbns,
+            "initial_stock": args.stock,
+            "statuses": statuses,
+            "sold": sold,
+            "final_stock": final_stock,
+            "oversold": any(stock < 0 for stock in final_stock.values()) or not consistent,
+            "latency": summarize([lat for status, _, lat in results if status == 200],
+                                 sum(1 for status, _, _ in results if status != 200), elapsed),
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        cursor.execute("DELETE FROM user WHERE username LIKE %s", (f"bench_{run_id}_%",))
+        cursor.execute("DELETE FROM Publisher_Order WHERE orderID > %s", (last_publisher_order,))
+        for isbn, stock in original_stock.items():
+            cursor.execute("UPDATE Book SET StockQuantity = %s WHERE ISBN = %s", (stock, isbn))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare the sync app (backend:app) with the async app (backend_async:app)
+under many concurrent clients.
+
+Each mode is started in its own uvicorn process, driven with the same mix
+of catalog reads, then stopped:
+
+    python -m benchmarks.concurrency --clients 500 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from benchmarks.httpclient import Connection
+from benchmarks.load import run_load
+
+MODES = {"sync": "backend:app", "async": "backend_async:app"}
+TERMS = ["the", "and", "history", "science", "art", "linear", "crime"]
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not start within {timeout}s")
+
+
+def catalog_mix(isbns):
+    def next_request(client_id):
+        if random.random() < 0.5:
+            isbn = random.choice(isbns)
+            return "GET /books/{isbn}", "GET", f"/books/{quote(isbn)}", None
+        term = random.choice(TERMS)
+        return "GET /books/search", "GET", f"/books/search?title={quote(term)}&limit=20", None
+    return next_request
+
+
+def sample_isbns(host, port, count=200):
+    async def fetch():
+        conn = Connection(host, port)
+        try:
+            _, _, body = await conn.request("GET", f"/books/search?limit={count}")
+        finally:
+            await conn.close()
+        return [book["ISBN"] for book in json.loads(body)]
+    return asyncio.run(fetch())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["sync", "async"])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    report = {"clients": args.clients, "duration_s": args.duration, "modes": {}}
+    for mode in args.modes:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", MODES[mode], "--host", args.host, "--port", str(args.port),
+             "--log-level", "warning", "--backlog", str(max(2048, args.clients * 2))],
+        )
+        try:
+            wait_for_port(args.host, args.port)
+            isbns = sample_isbns(args.host, args.port) or ["978-01"]
+            report["modes"][mode] = asyncio.run(
+                run_load(args.host, args.port, args.clients, args.duration, catalog_mix(isbns), args.warmup)
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
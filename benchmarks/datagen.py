@@ -0,0 +1,225 @@
+"""
+Generate a large, reproducible dataset directly into MySQL.
+
+Rows are written with batched multi-row INSERTs (executemany) and explicit
+IDs, with unique and foreign key checks off for the session. The same
+--seed always gives the same data. Generated rows are recognisable by prefix
+(ISBN "BG-", username "gen_user_", "Gen Publisher"/"Gen Author"), so they
+can be removed again with --clean without touching the demo data:
+
+    python -m benchmarks.datagen --books 1000000 --users 100000 --order-items 10000000
+    python -m benchmarks.datagen --clean
+
+Order popularity is skewed (a few books sell most copies), order dates are
+spread over --days days before today, and every generated user's password
+is "bench". The sales rollups are rebuilt at the end.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+import auth
+import rollups
+from backend import db_config
+from catalog_import import VALID_CATEGORIES
+
+ISBN_PREFIX = "BG-"
+USER_PREFIX = "gen_user_"
+PUBLISHER_PREFIX = "Gen Publisher "
+AUTHOR_PREFIX = "Gen Author "
+PASSWORD = "bench"
+
+WORDS = [
+    "history", "science", "art", "linear", "algebra", "crime", "ocean", "empire", "garden", "machine",
+    "river", "shadow", "light", "quantum", "ancient", "modern", "theory", "journey", "secret", "island",
+    "mountain", "city", "war", "peace", "faith", "map", "atlas", "physics", "poetry", "silence",
+    "winter", "summer", "desert", "kingdom", "stars", "mind", "code", "signal", "storm", "harbor",
+]
+FIRST_NAMES = ["Omar", "Sarah", "Mona", "Ali", "Nour", "Youssef", "Laila", "Karim", "Hana", "Adam"]
+LAST_NAMES = ["Kamal", "Smith", "Hassan", "Ibrahim", "Farouk", "Nasser", "Mahmoud", "Salem", "Fahmy", "Adel"]
+
+
+def isbn_of(index):
+    return f"{ISBN_PREFIX}{index:09d}"
+
+
+def price_of(index):
+    # Deterministic per book, so order items can be priced without a lookup
+    return round(5 + (index * 7919 % 19500) / 100, 2)
+
+
+def next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+class Writer:
+    """
+    Buffers rows per statement and flushes them as multi-row INSERTs.
+    """
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, query, row):
+        buffer = self.buffers.setdefault(query, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(query)
+
+    def flush(self, query=None):
+        for q in ([query] if query else list(self.buffers)):
+            rows = self.buffers.get(q)
+            if rows:
+                self.cursor.executemany(q, rows)
+                self.counts[q] = self.counts.get(q, 0) + len(rows)
+                self.buffers[q] = []
+        self.conn.commit()
+
+
+def generate(conn, books, users, order_items, days, seed, batch_size, log=print):
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION unique_checks = 0")
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    writer = Writer(conn, batch_size)
+    summary = {}
+
+    publishers = max(20, books // 2000)
+    authors = max(50, books // 3)
+    first_pub = next_id(cursor, "Publisher", "PubID")
+    first_author = next_id(cursor, "Author", "authorID")
+    first_user = next_id(cursor, "user", "userID")
+    first_cart = next_id(cursor, "Shopping_Cart", "cartID")
+    first_order = next_id(cursor, "Customer_Order", "orderID")
+
+    started = time.perf_counter()
+    log(f"Publishers: {publishers}, authors: {authors}")
+    for i in range(publishers):
+        writer.add("INSERT INTO Publisher (PubID, name, phone, address) VALUES (%s, %s, %s, %s)",
+                   (first_pub + i, f"{PUBLISHER_PREFIX}{i}", f"555-{i:06d}", "Generated"))
+    for i in range(authors):
+        writer.add("INSERT INTO Author (authorID, author_name) VALUES (%s, %s)",
+                   (first_author + i, f"{AUTHOR_PREFIX}{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"))
+    writer.flush()
+
+    log(f"Books: {books}")
+    for i in range(books):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+        stock = rng.randint(50, 500)
+        writer.add(
+            "INSERT INTO Book (ISBN, Title, pubYear, Price, StockQuantity, threshold, category, PubID) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (isbn_of(i), title, rng.randint(1850, 2025), price_of(i), stock, rng.randint(5, 20),
+             rng.choice(VALID_CATEGORIES), first_pub + rng.randrange(publishers)))
+        for author in rng.sample(range(authors), k=rng.choice((1, 1, 1, 2, 3))):
+            writer.add("INSERT INTO Book_Author (ISBN, authorID) VALUES (%s, %s)", (isbn_of(i), first_author + author))
+        if i and i % 100000 == 0:
+            log(f"  {i} books")
+    writer.flush()
+
+    log(f"Users: {users}")
+    password = auth.hash_password(PASSWORD)
+    for i in range(users):
+        name = f"{USER_PREFIX}{i}"
+        writer.add(
+            "INSERT INTO user (userID, username, password, first_name, last_name, email, phone, address, Role) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'Customer')",
+            (first_user + i, name, password, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+             f"{name}@bench.invalid", "000", "Generated"))
+        writer.add("INSERT INTO Shopping_Cart (cartID, userID) VALUES (%s, %s)", (first_cart + i, first_user + i))
+    writer.flush()
+
+    log(f"Order items: {order_items}")
+    today = date.today()
+    order_id = first_order
+    written = 0
+    while written < order_items and users and books:
+        count = min(order_items - written, rng.choice((1, 1, 2, 2, 3, 4, 5)))
+        # Cubing a uniform draw skews sales towards low book indexes
+        picks = {int(books * rng.random() ** 3) for _ in range(count)}
+        items = [(isbn_of(book), rng.randint(1, 3), price_of(book)) for book in picks]
+        total = round(sum(qty * price for _, qty, price in items), 2)
+        writer.add(
+            "INSERT INTO Customer_Order (orderID, orderDate, totalPrice, status, card_number, card_expiry, userID) "
+            "VALUES (%s, %s, %s, 'Completed', %s, %s, %s)",
+            (order_id, today - timedelta(days=rng.randrange(days)), total, "4111111111111111", "2030-01-01",
+             first_user + rng.randrange(users)))
+        for isbn, qty, price in items:
+            writer.add("INSERT INTO Customer_Order_Item (orderID, ISBN, Quantity, Price_at_purchase) "
+                       "VALUES (%s, %s, %s, %s)", (order_id, isbn, qty, price))
+        order_id += 1
+        written += len(items)
+        if order_id % 200000 == 0:
+            log(f"  {written} order items")
+    writer.flush()
+
+    cursor.execute("SET SESSION unique_checks = 1")
+    cursor.execute("SET SESSION foreign_key_checks = 1")
+    cursor.close()
+    summary["rows"] = {q.split()[2]: n for q, n in writer.counts.items()}
+    log("Rebuilding sales rollups")
+    summary["rollups"] = rollups.backfill(conn)
+    summary["seconds"] = round(time.perf_counter() - started, 1)
+    return summary
+
+
+def clean(conn, chunk=50000, log=print):
+    """
+    Delete generated rows in chunks; dependent rows go through ON DELETE CASCADE.
+    """
+    cursor = conn.cursor()
+    deleted = {}
+    for table, where, params in (
+        ("user", "username LIKE %s", (USER_PREFIX + "%",)),
+        ("Book", "ISBN LIKE %s", (ISBN_PREFIX + "%",)),
+        ("Author", "author_name LIKE %s", (AUTHOR_PREFIX + "%",)),
+        ("Publisher", "name LIKE %s", (PUBLISHER_PREFIX + "%",)),
+    ):
+        total = 0
+        while True:
+            cursor.execute(f"DELETE FROM {table} WHERE {where} LIMIT {chunk}", params)
+            conn.commit()
+            total += cursor.rowcount
+            if cursor.rowcount < chunk:
+                break
+        deleted[table] = total
+        log(f"Deleted {total} rows from {table}")
+    cursor.close()
+    deleted["rollups"] = rollups.backfill(conn)
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--order-items", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=730, help="Spread order dates over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--clean", action="store_true", help="Remove previously generated rows instead")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        if args.clean:
+            result = clean(conn)
+        else:
+            result = generate(conn, args.books, args.users, args.order_items, args.days, args.seed, args.batch_size)
+    finally:
+        conn.close()
+        auth.shutdown()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Closed-loop load driver: N virtual clients, each on its own keep-alive
+connection, issue requests back to back until the duration elapses.
+"""
+import asyncio
+import time
+
+from benchmarks.httpclient import Connection
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Latency percentiles (ms) and throughput for one group of requests.
+    """
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if count else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if count else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if count else None,
+        "max_ms": round(latencies[-1] * 1000, 3) if count else None,
+    }
+
+
+async def run_load(host, port, clients, duration, next_request, warmup=0.0):
+    """
+    Drive the server and return per-label results plus a total.
+
+    `next_request(client_id)` returns (label, method, path, body), optionally
+    followed by a dict of extra request headers; a response
+    status >= 400 (or a connection error) counts as an error for that label.
+    """
+    latencies = {}
+    errors = {}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client(client_id):
+        conn = Connection(host, port)
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                label, method, path, body, *headers = next_request(client_id)
+                t0 = time.perf_counter()
+                try:
+                    status, _, _ = await conn.request(method, path, body, *headers)
+                    ok = status < 400
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    ok = False
+                    await conn.close()
+                t1 = time.perf_counter()
+                if t0 < measure_from:
+                    continue
+                if ok:
+                    latencies.setdefault(label, []).append(t1 - t0)
+                else:
+                    errors[label] = errors.get(label, 0) + 1
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - measure_from
+
+    results = {label: summarize(latencies.get(label, []), errors.get(label, 0), elapsed)
+               for label in sorted(set(latencies) | set(errors))}
+    results["total"] = summarize([v for vs in latencies.values() for v in vs], sum(errors.values()), elapsed)
+    return results
@@ -0,0 +1,171 @@
+"""
+Drive scripted traffic mixes against a running backend at fixed
+concurrency and report p50/p95/p99 latency and throughput per endpoint.
+
+Mixes are weighted scenarios; each client picks a scenario and runs its
+requests in order (so a checkout is preceded by its add-to-cart). Clients
+that touch carts each act as their own generated user (see
+benchmarks.datagen), so carts never collide. Reports are JSON and include
+the git commit, so runs can be compared across commits:
+
+    python -m benchmarks.datagen --books 100000 --users 10000
+    python -m benchmarks.loadgen --mix browse=70,cart=20,checkout=5,admin=5 --clients 64 --duration 60 --output run.json
+
+Checkouts write real orders and reduce stock; run against a disposable
+database.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import mysql.connector
+
+from backend import SEARCH_SORT_COLUMNS, db_config
+from benchmarks.datagen import USER_PREFIX, WORDS
+from benchmarks.load import run_load
+from catalog_import import VALID_CATEGORIES
+
+
+def sample_catalog(cursor, count):
+    cursor.execute("SELECT COUNT(*) FROM Book")
+    total = cursor.fetchone()[0] or 1
+    # One pass with a random filter instead of ORDER BY RAND() over the table
+    cursor.execute("SELECT ISBN FROM Book WHERE RAND() < %s LIMIT %s", (min(1.0, 2.0 * count / total), count))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def sample_users(cursor, count):
+    cursor.execute("SELECT userID FROM user WHERE username LIKE %s ORDER BY userID LIMIT %s",
+                   (USER_PREFIX + "%", count))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def browse(rng, isbns, user_id):
+    roll = rng.random()
+    if roll < 0.35:
+        isbn = rng.choice(isbns)
+        return [("GET /books/{isbn}", "GET", f"/books/{quote(isbn)}", None)]
+    if roll < 0.55:
+        category = rng.choice(VALID_CATEGORIES)
+        sort = rng.choice([s for s in SEARCH_SORT_COLUMNS if s != "relevance"])
+        return [("GET /books/search?category", "GET", f"/books/search?category={category}&sort={sort}&limit=20", None)]
+    if roll < 0.8:
+        term = rng.choice(WORDS)
+        return [("GET /books/search?q", "GET", f"/books/search?q={quote(term)}&limit=20", None)]
+    term = rng.choice(WORDS)
+    return [("GET /books/search?title", "GET", f"/books/search?title={quote(term)}&limit=20", None)]
+
+
+def cart(rng, isbns, user_id):
+    isbn = rng.choice(isbns)
+    return [
+        ("POST /cart/add", "POST", f"/cart/add?userID={user_id}", {"ISBN": isbn, "Quantity": 1}),
+        ("GET /cart/{userID}", "GET", f"/cart/{user_id}", None),
+        ("DELETE /cart/remove", "DELETE", f"/cart/remove?userID={user_id}&isbn={quote(isbn)}", None),
+    ]
+
+
+def checkout(rng, isbns, user_id):
+    items = [{"ISBN": isbn, "Quantity": 1} for isbn in rng.sample(isbns, k=min(len(isbns), rng.randint(1, 3)))]
+    return [
+        ("PUT /cart/items", "PUT", f"/cart/items?userID={user_id}", {"items": items, "replace": True}),
+        ("POST /customer/checkout", "POST", "/customer/checkout",
+         {"userID": user_id, "card_number": "4111111111111111", "card_expiry": "2030-01-01"}),
+    ]
+
+
+def admin(rng, isbns, user_id):
+    end = date.today()
+    start = end - timedelta(days=rng.choice((7, 30, 90, 365)))
+    return [rng.choice([
+        ("GET /admin/reports/sales", "GET", f"/admin/reports/sales?start={start}&end={end}&bucket="
+         + rng.choice(("day", "week", "month", "category")), None),
+        ("GET /admin/reports/top-selling-books", "GET", "/admin/reports/top-selling-books", None),
+        ("GET /admin/reports/top-customers", "GET", "/admin/reports/top-customers", None),
+        ("GET /admin/reports/sales-prev-month", "GET", "/admin/reports/sales-prev-month", None),
+    ])]
+
+
+SCENARIOS = {"browse": browse, "cart": cart, "checkout": checkout, "admin": admin}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def scripted_mix(mix, isbns, users, seed):
+    names, weights = list(mix), list(mix.values())
+    rngs, queues = {}, {}
+
+    def next_request(client_id):
+        rng = rngs.setdefault(client_id, random.Random(seed * 100003 + client_id))
+        queue = queues.setdefault(client_id, [])
+        if not queue:
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            queue.extend(scenario(rng, isbns, users[client_id % len(users)] if users else None))
+        return queue.pop(0)
+    return next_request
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browse=70,cart=20,checkout=5,admin=5"))
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sample-books", type=int, default=2000)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        isbns = sample_catalog(cursor, args.sample_books)
+        users = sample_users(cursor, args.clients)
+    finally:
+        conn.close()
+    if not isbns:
+        parser.error("The catalog is empty; generate data with benchmarks.datagen first")
+    if not users and ({"cart", "checkout"} & set(args.mix)):
+        parser.error("Cart and checkout scenarios need generated users (benchmarks.datagen)")
+
+    started = time.time()
+    results = asyncio.run(run_load(args.host, args.port, args.clients, args.duration,
+                                   scripted_mix(args.mix, isbns, users, args.seed), args.warmup))
+    report = {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        "config": {"mix": args.mix, "clients": args.clients, "duration_s": args.duration,
+                   "warmup_s": args.warmup, "seed": args.seed, "sampled_books": len(isbns)},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
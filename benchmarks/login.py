@@ -0,0 +1,86 @@
+"""
+Login throughput: many clients logging in at once while others verify
+session tokens and read the catalog.
+
+Needs a running backend and writes to its database (throwaway customers,
+removed afterwards). Logins show what the hash pool sustains; the session
+and catalog latencies show whether hashing stalls everything else:
+
+    python -m benchmarks.login --users 50 --clients 100 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+
+import mysql.connector
+
+from backend import db_config
+from benchmarks.httpclient import Connection
+from benchmarks.load import run_load
+
+PASSWORD = "bench-password"
+
+
+async def create_users(host, port, run_id, count):
+    conn = Connection(host, port)
+    users = []
+    try:
+        for index in range(count):
+            name = f"bench_{run_id}_{index}"
+            status, _, body = await conn.request("POST", "/customer/signup", {
+                "username": name, "password": PASSWORD, "first_name": "Bench", "last_name": str(index),
+                "email": f"{name}@bench.invalid", "phone": "000", "address": "bench",
+            })
+            if status != 200:
+                raise RuntimeError(f"Signup failed: {body[:200]!r}")
+            status, _, body = await conn.request("POST", "/login", {"username": name, "password": PASSWORD})
+            if status != 200:
+                raise RuntimeError(f"Login failed: {body[:200]!r}")
+            users.append((name, json.loads(body)["token"]))
+    finally:
+        await conn.close()
+    return users
+
+
+def login_mix(users, login_share):
+    def next_request(client_id):
+        name, token = random.choice(users)
+        roll = random.random()
+        if roll < login_share:
+            return "POST /login", "POST", "/login", {"username": name, "password": PASSWORD}
+        if roll < login_share + (1 - login_share) / 2:
+            return "GET /session", "GET", "/session", None, {"Authorization": f"Bearer {token}"}
+        return "GET /books/search", "GET", "/books/search?limit=10", None
+    return next_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--login-share", type=float, default=0.5, help="Fraction of requests that are logins")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        users = asyncio.run(create_users(args.host, args.port, run_id, args.users))
+        results = asyncio.run(run_load(args.host, args.port, args.clients, args.duration,
+                                       login_mix(users, args.login_share), args.warmup))
+        print(json.dumps({"users": args.users, "clients": args.clients, "duration_s": args.duration,
+                          "login_share": args.login_share, "results": results}, indent=2))
+    finally:
+        db = mysql.connector.connect(**db_config)
+        cursor = db.cursor()
+        cursor.execute("DELETE FROM user WHERE username LIKE %s", (f"bench_{run_id}_%",))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
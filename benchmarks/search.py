@@ -0,0 +1,62 @@
+"""
+Compare the LIKE title search with the FULLTEXT ranked search.
+
+Both statements are built by backend.build_search_query, so the benchmark
+measures exactly the SQL the endpoint runs:
+
+    python -m benchmarks.search --terms "linear algebra" "crime" --runs 50
+"""
+import argparse
+import json
+import statistics
+import time
+
+import mysql.connector
+
+from backend import build_search_query, db_config
+
+
+def time_query(conn, query, params, runs):
+    cursor = conn.cursor()
+    timings = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(query, tuple(params))
+        rows = len(cursor.fetchall())
+        timings.append(time.perf_counter() - start)
+    cursor.close()
+    timings.sort()
+    return {
+        "rows": rows,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", nargs="+", default=["the", "linear algebra", "dostoevsky"])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    results = []
+    try:
+        for term in args.terms:
+            like_query, like_params, _ = build_search_query(title=term)
+            ft_query, ft_params, _ = build_search_query(q=term, sort="relevance")
+            results.append({
+                "term": term,
+                "like": time_query(conn, like_query + " LIMIT %s", like_params + [args.limit], args.runs),
+                "fulltext": time_query(conn, ft_query + " LIMIT %s", ft_params + [args.limit], args.runs),
+            })
+    finally:
+        conn.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
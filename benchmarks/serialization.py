@@ -0,0 +1,101 @@
+"""
+CPU cost of serializing large list responses: FastAPI's default path
+(dictionary cursor rows -> jsonable_encoder -> JSONResponse) against
+fastjson (tuple rows -> column-wise conversion -> one encoder call), with
+and without orjson, plus the cost and size of gzipping the result.
+
+Rows are synthetic, shaped like GET /admin/publisher-orders, so no
+database is needed:
+
+    python -m benchmarks.serialization --rows 1000 10000 50000
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from mysql.connector import FieldType
+
+import fastjson
+
+DESCRIPTION = [
+    ("orderID", FieldType.LONG), ("orderDate", FieldType.DATE), ("Quantity", FieldType.LONG),
+    ("status", FieldType.VAR_STRING), ("ISBN", FieldType.VAR_STRING), ("Title", FieldType.VAR_STRING),
+    ("threshold", FieldType.LONG), ("Price", FieldType.NEWDECIMAL), ("PubID", FieldType.LONG),
+    ("publisher_name", FieldType.VAR_STRING),
+]
+
+
+def make_rows(count, seed=42):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    return [
+        (i, start + timedelta(days=rng.randrange(2000)), rng.randint(1, 50), rng.choice(("Pending", "Confirmed")),
+         f"978-{rng.randrange(10**9):09d}", f"Book Title {rng.randrange(10**6)}", rng.randint(5, 20),
+         Decimal(rng.randrange(500, 20000)) / 100, rng.randint(1, 200), f"Publisher {rng.randrange(500)}")
+        for i in range(count)
+    ]
+
+
+def cpu_ms(fn, runs):
+    best = None
+    for _ in range(runs):
+        start = time.process_time()
+        result = fn()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3), result
+
+
+def fastapi_default(rows):
+    # What returning a dictionary cursor's fetchall() from a route costs
+    names = [column[0] for column in DESCRIPTION]
+    dict_rows = [dict(zip(names, row)) for row in rows]
+    return JSONResponse(jsonable_encoder(dict_rows)).body
+
+
+def with_orjson(enabled, fn):
+    saved = fastjson.orjson
+    if not enabled:
+        fastjson.orjson = None
+    try:
+        return fn()
+    finally:
+        fastjson.orjson = saved
+
+
+def bench(count, runs):
+    rows = make_rows(count)
+    result = {"rows": count}
+    result["fastapi_ms"], baseline = cpu_ms(lambda: fastapi_default(rows), runs)
+    variants = [("fastjson_stdlib", False)] + ([("fastjson_orjson", True)] if fastjson.orjson else [])
+    for name, enabled in variants:
+        ms, body = with_orjson(enabled, lambda: cpu_ms(lambda: fastjson.encode_rows(DESCRIPTION, rows), runs))
+        if json.loads(body) != json.loads(baseline):
+            raise AssertionError(f"{name} output differs from FastAPI's")
+        result[f"{name}_ms"] = ms
+        result[f"{name}_speedup"] = round(result["fastapi_ms"] / ms, 2) if ms else None
+    result["json_bytes"] = len(baseline)
+    for level in (1, 5, 9):
+        ms, compressed = cpu_ms(lambda: gzip.compress(baseline, compresslevel=level), runs)
+        result[f"gzip{level}_ms"] = ms
+        result[f"gzip{level}_bytes"] = len(compressed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--runs", type=int, default=5, help="Best CPU time of this many runs")
+    args = parser.parse_args()
+    print(json.dumps({"orjson": fastjson.orjson is not None,
+                      "results": [bench(count, args.runs) for count in args.rows]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Writers call `invalidate` after committing. Readers take a `token()`
+    before loading from the database and pass it to `set`, which skips the
+    store if any invalidation happened in between, so a slow reader cannot
+    put back data that a concurrent write just made stale.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def token(self):
+        with self._lock:
+            return self._epoch
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, token=None):
+        with self._lock:
+            if token is not None and token != self._epoch:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class TableVersions:
+    """
+    Per-table change counters behind the ETag/Last-Modified validators of
+    cacheable GET routes.
+
+    Writers call `bump` after committing. Readers take `validators()` before
+    loading from the database, so a write that lands mid-read leaves the
+    response with the older tag and the next revalidation misses. Counters
+    live in this process; tags carry a random per-process prefix so a tag
+    issued by another worker never matches.
+
+    Writes from other workers and from outside the API (CLIs, manual SQL)
+    don't bump these counters, so a validator is only trusted for
+    `max_age` seconds: tags include the current max_age window and
+    Last-Modified is never older than the window's start. Last-Modified is
+    also withheld until its second has passed, so a later write in the
+    same second can't hide behind an If-Modified-Since match.
+    """
+
+    def __init__(self, max_age=30.0):
+        self.max_age = max_age
+        self.prefix = secrets.token_hex(4)
+        self._started = time.time()
+        self._versions = {}
+        self._modified = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables):
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+
+    def validators(self, tables, settle=0.0):
+        """
+        (etag, last_modified whole-second timestamp or None) for data read
+        from `tables`, or None if one of them changed within the last
+        `settle` seconds (replicas may not have the change yet).
+        """
+        now = time.time()
+        window = int(now // self.max_age)
+        with self._lock:
+            versions = [self._versions.get(table, 0) for table in tables]
+            modified = max(self._modified.get(table, self._started) for table in tables)
+        if settle and now - modified < settle:
+            return None
+        modified = max(modified, window * self.max_age)
+        last_modified = int(modified) if int(modified) < int(now) else None
+        return f'W/"{self.prefix}-{window}-{"-".join(map(str, versions))}"', last_modified
+
+    def stats(self):
+        with self._lock:
+            return {"prefix": self.prefix, "max_age": self.max_age, "versions": dict(self._versions)}
@@ -0,0 +1,269 @@
+"""
+Bulk catalog import.
+
+Reads CSV or NDJSON book records as a stream, validates them against
+preloaded publisher/author ID sets and writes Book and Book_Author rows in
+batched multi-row INSERTs, committing once per chunk. Used by the
+POST /admin/books/import endpoint and directly from the command line:
+
+    python catalog_import.py books.csv --upsert --chunk-size 5000
+
+CSV files need a header row with the Book columns (ISBN, Title, pubYear,
+Price, StockQuantity, threshold, category, PubID) and an optional
+authorIDs column holding IDs separated by ';'. NDJSON records use the same
+keys, with authorIDs as a list.
+
+With upsert, a later row for the same ISBN in one chunk supersedes the
+earlier one, and the superseded row is reported as a duplicate. Repeats in
+different chunks are not tracked (memory stays flat however large the
+upload): the earlier row is counted as inserted and the later one as
+updated. Either way inserted + updated + failed + duplicates always equals
+processed.
+"""
+import argparse
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector
+
+VALID_CATEGORIES = ['Science', 'Art', 'Religion', 'History', 'Geography']
+BOOK_COLUMNS = ['ISBN', 'Title', 'pubYear', 'Price', 'StockQuantity', 'threshold', 'category', 'PubID']
+FORMATS = ['csv', 'ndjson']
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_records(lines, fmt):
+    """
+    Yield (row number, record) pairs; a record that cannot be parsed is
+    yielded as a RowError instead of aborting the import.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row_number, row in enumerate(reader, start=1):
+            if None in row:
+                yield row_number, RowError("Row has more fields than the header")
+                continue
+            authors = (row.get('authorIDs') or '').strip()
+            row['authorIDs'] = [a for a in authors.split(';') if a.strip()] if 'authorIDs' in row else None
+            yield row_number, row
+    elif fmt == 'ndjson':
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, RowError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield row_number, RowError("Each line must be a JSON object")
+                continue
+            yield row_number, record
+    else:
+        raise ValueError(f"Invalid format. Must be one of: {', '.join(FORMATS)}")
+
+
+def _int(record, field, minimum=None):
+    try:
+        value = int(str(record.get(field)).strip())
+    except (TypeError, ValueError):
+        raise RowError(f"{field} must be an integer")
+    if minimum is not None and value < minimum:
+        raise RowError(f"{field} must be at least {minimum}")
+    return value
+
+
+def validate(record, pub_ids, author_ids):
+    """
+    Return (book values tuple, author ID list or None) for a valid record.
+    """
+    isbn = str(record.get('ISBN') or '').strip()
+    if not isbn or len(isbn) > 20:
+        raise RowError("ISBN is required (at most 20 characters)")
+    title = str(record.get('Title') or '').strip()
+    if not title or len(title) > 255:
+        raise RowError("Title is required (at most 255 characters)")
+    pub_year = _int(record, 'pubYear')
+    try:
+        price = Decimal(str(record.get('Price')).strip())
+    except (InvalidOperation, ValueError):
+        raise RowError("Price must be a number")
+    if not price.is_finite() or price < 0:
+        raise RowError("Price must be a non-negative number")
+    stock = _int(record, 'StockQuantity', minimum=0)
+    threshold = _int(record, 'threshold', minimum=0)
+    category = str(record.get('category') or '').strip()
+    if category not in VALID_CATEGORIES:
+        raise RowError(f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}")
+    pub_id = _int(record, 'PubID')
+    if pub_id not in pub_ids:
+        raise RowError("Publisher ID not found")
+
+    authors = record.get('authorIDs')
+    if authors is not None:
+        if not isinstance(authors, list):
+            raise RowError("authorIDs must be a list")
+        try:
+            authors = list(dict.fromkeys(int(str(a).strip()) for a in authors))
+        except ValueError:
+            raise RowError("authorIDs must be integers")
+        missing = [a for a in authors if a not in author_ids]
+        if missing:
+            raise RowError(f"Author IDs not found: {', '.join(map(str, missing))}")
+    return (isbn, title, pub_year, price, stock, threshold, category, pub_id), authors
+
+
+class CatalogImporter:
+    """
+    Validates and writes book records chunk by chunk on one connection.
+    """
+
+    def __init__(self, conn, upsert=False, chunk_size=1000, max_errors=1000):
+        self.conn = conn
+        self.upsert = upsert
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.duplicates = 0
+        self.duplicate_rows = []
+
+    def error(self, row_number, isbn, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "ISBN": isbn, "error": message})
+
+    def duplicate(self, row_number, isbn, superseded_by):
+        self.duplicates += 1
+        if len(self.duplicate_rows) < self.max_errors:
+            self.duplicate_rows.append({"row": row_number, "ISBN": isbn, "superseded_by": superseded_by})
+
+    def load_reference_ids(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT PubID FROM Publisher")
+        pub_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT authorID FROM Author")
+        author_ids = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        return pub_ids, author_ids
+
+    def run(self, lines, fmt):
+        pub_ids, author_ids = self.load_reference_ids()
+        chunk = []
+        for row_number, record in iter_records(lines, fmt):
+            self.processed += 1
+            if isinstance(record, RowError):
+                self.error(row_number, None, str(record))
+                continue
+            try:
+                values, authors = validate(record, pub_ids, author_ids)
+            except RowError as e:
+                self.error(row_number, record.get('ISBN'), str(e))
+                continue
+            chunk.append((row_number, values, authors))
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.write_chunk(chunk)
+        return self.report()
+
+    def write_chunk(self, chunk):
+        # With upsert, later rows win over earlier rows with the same ISBN
+        by_isbn = {}
+        for row_number, values, authors in chunk:
+            if values[0] in by_isbn:
+                if not self.upsert:
+                    self.error(row_number, values[0], "Duplicate ISBN in upload")
+                    continue
+                self.duplicate(by_isbn[values[0]][0], values[0], row_number)
+            by_isbn[values[0]] = (row_number, values, authors)
+
+        cursor = self.conn.cursor()
+        try:
+            isbns = list(by_isbn)
+            placeholders = ','.join(['%s'] * len(isbns))
+            cursor.execute(f"SELECT ISBN FROM Book WHERE ISBN IN ({placeholders})", tuple(isbns))
+            existing = {row[0] for row in cursor.fetchall()}
+            if not self.upsert:
+                for isbn in existing:
+                    row_number, _, _ = by_isbn.pop(isbn)
+                    self.error(row_number, isbn, "ISBN already exists")
+            if not by_isbn:
+                return
+
+            rows = list(by_isbn.values())
+            query = f"INSERT INTO Book ({', '.join(BOOK_COLUMNS)}) VALUES ({', '.join(['%s'] * len(BOOK_COLUMNS))})"
+            if self.upsert:
+                query += " ON DUPLICATE KEY UPDATE " + ", ".join(
+                    f"{column} = VALUES({column})" for column in BOOK_COLUMNS[1:]
+                )
+            cursor.executemany(query, [values for _, values, _ in rows])
+
+            # Replace author links only for rows that specify them
+            linked = [(values[0], authors) for _, values, authors in rows if authors is not None]
+            relink = [isbn for isbn, _ in linked if isbn in existing]
+            if relink:
+                cursor.execute(
+                    f"DELETE FROM Book_Author WHERE ISBN IN ({','.join(['%s'] * len(relink))})", tuple(relink)
+                )
+            links = [(isbn, author_id) for isbn, authors in linked for author_id in authors]
+            if links:
+                cursor.executemany("INSERT INTO Book_Author (ISBN, authorID) VALUES (%s, %s)", links)
+
+            self.conn.commit()
+            updated = sum(1 for isbn in by_isbn if isbn in existing)
+            self.updated += updated
+            self.inserted += len(by_isbn) - updated
+        except mysql.connector.Error as err:
+            self.conn.rollback()
+            for row_number, values, _ in by_isbn.values():
+                self.error(row_number, values[0], f"Chunk write failed: {err}")
+        finally:
+            cursor.close()
+
+    def report(self):
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "duplicate_rows": self.duplicate_rows,
+            "duplicate_rows_truncated": self.duplicates > len(self.duplicate_rows),
+        }
+
+
+def main():
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description="Bulk import books from a CSV or NDJSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--upsert", action="store_true", help="Update books whose ISBN already exists")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+    conn = mysql.connector.connect(**db_config)
+    try:
+        with open(args.path, newline='', encoding='utf-8') as lines:
+            report = CatalogImporter(conn, args.upsert, args.chunk_size).run(lines, fmt)
+    finally:
+        conn.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
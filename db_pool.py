@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+logger = logging.getLogger("bookstore.db_pool")
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection could be checked out within the pool timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe MySQL connection pool.
+
+    Keeps up to `size` idle connections open, allows `max_overflow` extra
+    connections under bursts (closed again on release), recycles connections
+    older than `recycle` seconds or idle longer than `idle_timeout` seconds,
+    and pings idle connections on checkout when `pre_ping` is set.
+    """
+
+    def __init__(self, db_config, size=10, max_overflow=10, timeout=30.0,
+                 recycle=3600, idle_timeout=300, pre_ping=True):
+        self.db_config = db_config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, created_at, released_at)
+        self._created = {}    # id(conn) -> created_at for checked-out connections
+        self._open = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Counters for saturation reporting
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.recycled = 0
+        self.ping_failures = 0
+
+    def _connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _is_stale(self, created_at, released_at, now):
+        if self.recycle is not None and now - created_at > self.recycle:
+            return True
+        if self.idle_timeout is not None and now - released_at > self.idle_timeout:
+            return True
+        return False
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to `timeout` seconds when saturated.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, created_at, released_at = self._idle.pop()
+                    if self._is_stale(created_at, released_at, time.monotonic()):
+                        self._open -= 1
+                        self.recycled += 1
+                        self._discard(conn)
+                        continue
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    conn, created_at = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"({self._open} open, {self._waiting} waiting)"
+                    )
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                    logger.warning(
+                        "Connection pool saturated: %d/%d connections in use, %d requests waiting",
+                        self._open, self.size + self.max_overflow, self._waiting + 1,
+                    )
+                self._waiting += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self.checkouts += 1
+            wait_time = time.monotonic() - start
+            if waited:
+                self.wait_seconds += wait_time
+
+        # Network work happens outside the lock
+        if conn is not None and self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                self.ping_failures += 1
+                self._discard(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except mysql.connector.Error:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+            created_at = time.monotonic()
+
+        with self._lock:
+            self._created[id(conn)] = created_at
+        return conn
+
+    def release(self, conn):
+        """
+        Return a connection to the pool, rolling back any open transaction.
+        """
+        with self._lock:
+            created_at = self._created.pop(id(conn), time.monotonic())
+            keep = not self._closed and len(self._idle) < self.size
+
+        if keep:
+            try:
+                conn.rollback()
+            except mysql.connector.Error:
+                keep = False
+
+        with self._lock:
+            if keep and not self._closed:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._discard(conn)
+            self._lock.notify()
+
+    def dispose(self):
+        """
+        Close every idle connection and refuse further checkouts.
+        """
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._open -= 1
+                self._discard(conn)
+            self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "timeouts": self.timeouts,
+                "recycled": self.recycled,
+                "ping_failures": self.ping_failures,
+            }
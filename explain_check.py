@@ -0,0 +1,190 @@
+"""
+EXPLAIN regression check for the SQL behind the API endpoints.
+
+Runs EXPLAIN on every endpoint query against a seeded database (init.sql
+plus `python migrate.py up`) and fails when a table is read with a full
+scan (type ALL) and no index could have been used (possible_keys is
+empty). That is what a dropped index or a non-sargable rewrite looks like.
+The optimizer may still scan a small table even when an index exists;
+those rows are only reported as warnings.
+
+Scans that are the point of the query (full listings, substring LIKE
+filters) are allowed per case. Exits non-zero on failure, so it can
+gate CI:
+
+    python explain_check.py
+    python explain_check.py --verbose
+
+The same cases run under pytest (tests/test_explain.py) when the database
+in backend.db_config is reachable.
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mysql.connector
+
+import backend
+import jobs
+import replenishment
+import rollups
+
+
+def default_samples():
+    """
+    Key values used when the database has no rows to take them from.
+    """
+    end = date.today()
+    return {
+        "isbn": "978-01", "pub_id": 1, "category": "Science", "user_id": 1, "cart_id": 1, "order_id": 1,
+        "username": "admin", "start": end - timedelta(days=90), "end": end + timedelta(days=1),
+    }
+
+
+def samples(cursor):
+    """
+    Real key values to plug into the queries, so plans match live traffic.
+    """
+    s = default_samples()
+    cursor.execute("SELECT ISBN, PubID, category FROM Book ORDER BY ISBN LIMIT 1")
+    book = cursor.fetchone()
+    if book:
+        s.update(isbn=book["ISBN"], pub_id=book["PubID"], category=book["category"])
+    cursor.execute("SELECT userID FROM user WHERE Role = 'Customer' ORDER BY userID LIMIT 1")
+    user = cursor.fetchone()
+    if user:
+        s["user_id"] = user["userID"]
+    cursor.execute("SELECT cartID FROM Shopping_Cart WHERE userID = %s", (s["user_id"],))
+    cart = cursor.fetchone()
+    if cart:
+        s["cart_id"] = cart["cartID"]
+    cursor.execute("SELECT COALESCE(MAX(orderID), 1) AS orderID FROM Customer_Order")
+    s["order_id"] = cursor.fetchone()["orderID"]
+    cursor.execute("SELECT username FROM user ORDER BY userID LIMIT 1")
+    user = cursor.fetchone()
+    if user:
+        s["username"] = user["username"]
+    return s
+
+
+def cases(s):
+    """
+    (name, query, params, tables allowed to be scanned) for each endpoint,
+    built by the same functions and constants the endpoints execute.
+    """
+    def search(**kwargs):
+        args = dict(title=None, category=None, isbn=None, author=None, sort="title",
+                    desc=False, cursor=None, q=None, limit=backend.SEARCH_DEFAULT_PAGE_SIZE)
+        args.update(kwargs)
+        query, params, _ = backend.search_page_query(**args)
+        return query, params
+
+    def export(query_params_columns):
+        query, params, _ = query_params_columns
+        return query, params
+
+    cart_item = backend.CartAddIn(ISBN=s["isbn"], Quantity=1)
+    bulk_confirm = backend.PublisherOrderBulkConfirm(PubID=s["pub_id"], start=s["start"], end=s["end"])
+    rollup_daily, rollup_book_daily, rollup_user_total = rollups.record_order_queries(s["order_id"])
+
+    return [
+        ("login", *backend.credentials_query(s["username"]), ()),
+        ("search (no filter, full catalog)", *search(), ("b",)),
+        ("search by category", *search(category=s["category"]), ()),
+        ("search by category, sort price", *search(category=s["category"], sort="price"), ()),
+        ("search by ISBN", *search(isbn=s["isbn"]), ()),
+        ("search title substring", *search(title="the"), ("b",)),
+        ("search author substring", *search(author="an"), ("a", "b")),
+        ("search full-text", *search(q="history"), ()),
+        ("search authors batch", *backend.authors_query([s["isbn"]]), ()),
+        ("search cart quantities", *backend.cart_quantities_query(s["user_id"], [s["isbn"]]), ()),
+        ("get book", *backend.book_query(s["isbn"]), ()),
+        ("get book publisher", *backend.book_publisher_query(s["pub_id"]), ()),
+        ("list publishers", backend.LIST_PUBLISHERS_QUERY, (), ("Publisher",)),
+        ("list authors", backend.LIST_AUTHORS_QUERY, (), ("Author",)),
+        ("list publisher orders", backend.LIST_PUBLISHER_ORDERS_QUERY, (), ("po", "b", "p")),
+        ("bulk confirm by publisher", *backend.bulk_confirm_query(bulk_confirm), ()),
+        ("cart lock", *backend.lock_cart_row_query(s["user_id"]), ()),
+        ("cart add upsert", *backend.cart_add_query(s["cart_id"], cart_item), ()),
+        ("view cart", *backend.view_cart_query(s["user_id"]), ()),
+        ("cart remove", *backend.cart_remove_query(s["user_id"], s["isbn"]), ()),
+        ("checkout lock cart", *backend.lock_cart_query(s["user_id"]), ()),
+        ("checkout lock books", *backend.lock_books_query([s["isbn"]]), ()),
+        ("checkout deduct stock", *backend.deduct_stock_query(s["order_id"]), ()),
+        ("order history", *backend.order_history_query(s["user_id"], None, 20), ()),
+        ("order history next page",
+         *backend.order_history_query(s["user_id"], backend.encode_cursor([s["end"], s["order_id"]]), 20), ()),
+        ("order history items", *backend.order_items_query([s["order_id"]]), ()),
+        # The full run reads every book and a window of the rollup on purpose
+        ("replenishment full run", *replenishment.load_query(s["end"]), ("b", "Sales_Book_Daily", "Publisher_Order")),
+        ("replenishment after checkout", *replenishment.load_query(s["end"], isbns=[s["isbn"]]), ()),
+        ("report prev month", backend.PREV_MONTH_SALES_QUERY, (), ()),
+        ("report daily", *backend.daily_sales_query(s["end"]), ()),
+        ("report top customers", backend.TOP_CUSTOMERS_QUERY, (), ()),
+        ("report top selling books", backend.TOP_SELLING_BOOKS_QUERY, (), ()),
+        *((f"report sales range by {bucket}", *backend.sales_report_query(s["start"], s["end"], bucket), ())
+          for bucket in [*backend.SALES_TIME_BUCKETS, *backend.SALES_GROUP_BUCKETS]),
+        ("report book replenishments", *backend.book_replenishments_query(s["isbn"]), ()),
+        ("rollup record order (daily)", *rollup_daily, ()),
+        ("rollup record order (book daily)", *rollup_book_daily, ()),
+        ("rollup record order (user total)", *rollup_user_total, ()),
+        ("job outbox poll", *jobs.ready_jobs_query(100), ()),
+        ("export books", *export(backend.export_books_query()), ("Book",)),
+        ("export customer orders by date",
+         *export(backend.export_customer_orders_query(s["start"], s["end"])), ()),
+        ("export customer orders since ID",
+         *export(backend.export_customer_orders_query(since_orderID=s["order_id"])), ()),
+        ("export publisher orders by date",
+         *export(backend.export_publisher_orders_query(s["start"], s["end"])), ()),
+        ("list users", backend.LIST_USERS_QUERY, (), ("user",)),
+    ]
+
+
+def check(cursor, name, query, params, allowed):
+    """
+    Return (failures, warnings) for one query's plan.
+    """
+    cursor.execute("EXPLAIN " + query, params or None)
+    failures, warnings = [], []
+    for row in cursor.fetchall():
+        table = row.get("table") or ""
+        if row.get("type") != "ALL" or table in allowed or table.startswith("<"):
+            continue
+        message = f"{name}: full scan of {table} ({row.get('rows')} rows)"
+        if row.get("possible_keys"):
+            warnings.append(f"{message}; index available: {row['possible_keys']}")
+        else:
+            failures.append(f"{message}; no usable index")
+    return failures, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if an endpoint query regresses to a full table scan.")
+    parser.add_argument("--verbose", action="store_true", help="Print every case and warning")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**backend.db_config)
+    cursor = conn.cursor(dictionary=True)
+    failures, warnings = [], []
+    try:
+        for name, query, params, allowed in cases(samples(cursor)):
+            case_failures, case_warnings = check(cursor, name, query, params, allowed)
+            failures += case_failures
+            warnings += case_warnings
+            if args.verbose:
+                print(f"{'FAIL' if case_failures else 'ok  '}  {name}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    if args.verbose:
+        for warning in warnings:
+            print("warning:", warning)
+    for failure in failures:
+        print("FAIL:", failure)
+    print(f"{len(failures)} failure(s), {len(warnings)} warning(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
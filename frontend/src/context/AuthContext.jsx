@@ -34,7 +34,8 @@ export function AuthProvider({ children }) {
       }
 
       const data = await res.json()
-      const userData = data.user
+      // The session token authenticates later requests (Authorization: Bearer)
+      const userData = { ...data.user, token: data.token }
       
       setUser(userData)
       localStorage.setItem('user', JSON.stringify(userData))
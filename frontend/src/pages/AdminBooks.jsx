@@ -80,9 +80,10 @@ export default function AdminBooks() {
 
   const loadBooks = async () => {
     try {
-      const res = await fetch(`${apiBase}/books/search`)
+      // Full catalog is streamed as NDJSON (one book per line)
+      const res = await fetch(`${apiBase}/books/search?format=ndjson`)
       if (!res.ok) throw new Error('Failed to load books')
-      const data = await res.json()
+      const data = (await res.text()).split('\n').filter(Boolean).map(line => JSON.parse(line))
       setBooks(data)
       setSearchResults(data) // Display all by default
     } catch (err) { setError('Failed to load books') }
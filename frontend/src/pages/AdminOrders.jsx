@@ -49,8 +49,9 @@ export default function AdminOrders() {
 
   const loadBooks = async () => {
     try {
-      const res = await fetch(`${apiBase}/books/search`)
-      const data = await res.json()
+      // Full catalog is streamed as NDJSON (one book per line)
+      const res = await fetch(`${apiBase}/books/search?format=ndjson`)
+      const data = (await res.text()).split('\n').filter(Boolean).map(line => JSON.parse(line))
       setBooks(data)
     } catch (err) {
       console.error('Failed to load books:', err)
@@ -84,6 +85,49 @@ export default function AdminOrders() {
     }
   }
 
+  const handleConfirmAllPending = async () => {
+    const pending = orders.filter(o => o.status === 'Pending').map(o => o.orderID)
+    if (pending.length === 0) return
+    if (!window.confirm(`Confirm all ${pending.length} pending orders? Stock will be automatically added.`)) return
+    setLoading(true)
+    try {
+      const res = await fetch(`${apiBase}/admin/confirm-orders`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ orderIDs: pending })
+      })
+      if (!res.ok) throw new Error('Failed to confirm orders')
+      const data = await res.json()
+      setMessage(`${data.confirmed} orders confirmed! Stock has been updated.`)
+      loadOrders()
+      loadBooks()
+      setTimeout(() => setMessage(''), 3000)
+    } catch (err) {
+      setError(err.message)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const handleRunReplenishment = async () => {
+    setLoading(true)
+    try {
+      const res = await fetch(`${apiBase}/admin/replenishment/run`, { method: 'POST' })
+      if (!res.ok) {
+        const data = await res.json().catch(() => ({}))
+        throw new Error(data.detail || 'Failed to run replenishment')
+      }
+      const data = await res.json()
+      setMessage(`Replenishment placed ${data.reordered} orders (${data.units} units).`)
+      loadOrders()
+      setTimeout(() => setMessage(''), 3000)
+    } catch (err) {
+      setError(err.message)
+    } finally {
+      setLoading(false)
+    }
+  }
+
   const handleCreateOrder = async (e) => {
     e.preventDefault()
     setLoading(true)
@@ -159,6 +203,14 @@ export default function AdminOrders() {
         <button className="button button-secondary" onClick={loadOrders} disabled={loading} style={{ marginBottom: '1rem' }}>
           {loading ? 'Loading...' : 'Refresh'}
         </button>
+        <button className="button button-primary" onClick={handleConfirmAllPending}
+          disabled={loading || !orders.some(o => o.status === 'Pending')} style={{ marginBottom: '1rem', marginLeft: '0.5rem' }}>
+          Confirm All Pending
+        </button>
+        <button className="button button-secondary" onClick={handleRunReplenishment}
+          disabled={loading} style={{ marginBottom: '1rem', marginLeft: '0.5rem' }}>
+          Run Replenishment
+        </button>
 
         {/* This wrapper ensures the table doesn't overflow the white card */}
         <div style={{ width: '100%', overflowX: 'auto', borderRadius: '8px' }}>
@@ -39,15 +39,13 @@ export default function Cart() {
     if (!user) return
     if (newQty < 1) return; // Prevent 0 or negative via input
 
-    // Calculate the difference because /cart/add adds to existing qty
-    const difference = newQty - currentQty;
-    if (difference === 0) return;
+    if (newQty === currentQty) return;
 
     try {
-      const res = await fetch(`${apiBase}/cart/add?userID=${user.userID}`, {
-        method: 'POST',
+      const res = await fetch(`${apiBase}/cart/items?userID=${user.userID}`, {
+        method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ ISBN: isbn, Quantity: difference })
+        body: JSON.stringify({ items: [{ ISBN: isbn, Quantity: newQty }] })
       });
 
       if (!res.ok) {
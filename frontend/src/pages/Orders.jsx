@@ -6,6 +6,7 @@ import { useAuth } from '../context/AuthContext'
 export default function Orders() {
   const [orders, setOrders] = useState([])
   const [loading, setLoading] = useState(true)
+  const [nextCursor, setNextCursor] = useState(null)
   const [error, setError] = useState('')
   const { user } = useAuth()
   const navigate = useNavigate()
@@ -18,17 +19,20 @@ export default function Orders() {
     }
   }, [user])
 
-  const load = async () => {
+  const load = async (cursor = null) => {
     if (!user) return
 
     setLoading(true)
     setError('')
     try {
-      const res = await fetch(`${apiBase}/customer/orders/${user.userID}`)
+      const params = new URLSearchParams()
+      if (cursor) params.append('cursor', cursor)
+      const res = await fetch(`${apiBase}/customer/orders/${user.userID}?${params.toString()}`)
       if (!res.ok) throw new Error('Failed to load orders')
 
       const data = await res.json()
-      setOrders(data)
+      setOrders(prev => cursor ? [...prev, ...data] : data)
+      setNextCursor(res.headers.get('X-Next-Cursor'))
     } catch (err) {
       setError('Failed to load orders. Please try again.')
       console.error(err)
@@ -45,7 +49,7 @@ export default function Orders() {
     <div className="page">
       <h2 className="page-title">Your Orders</h2>
 
-      {loading ? (
+      {loading && orders.length === 0 ? (
         <div className="loading">Loading orders...</div>
       ) : error ? (
         <div className="error-message">{error}</div>
@@ -75,10 +79,22 @@ export default function Orders() {
                 </div>
               </div>
               <div className="order-items">
-                <strong>Items:</strong> {order.items}
+                <strong>Items:</strong>
+                <ul>
+                  {order.items.map(item => (
+                    <li key={item.ISBN}>
+                      {item.Title} (x{item.Quantity}) @ ${parseFloat(item.Price_at_purchase).toFixed(2)}
+                    </li>
+                  ))}
+                </ul>
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button className="button" disabled={loading} onClick={() => load(nextCursor)}>
+              {loading ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
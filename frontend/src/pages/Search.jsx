@@ -10,6 +10,7 @@ export default function Search() {
   const [category, setCategory] = useState('')
   const [isbn, setIsbn] = useState('')
   const [results, setResults] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [message, setMessage] = useState('')
   const [quantities, setQuantities] = useState({})
@@ -27,7 +28,7 @@ export default function Search() {
     return () => clearTimeout(delaySearch)
   }, [title, category, isbn, user])
 
-  const doSearch = async (e) => {
+  const doSearch = async (e, cursor = null) => {
     if (e) e.preventDefault()
     setLoading(true)
     try {
@@ -36,14 +37,16 @@ export default function Search() {
       if (category) params.append('category', category)
       if (isbn.trim()) params.append('isbn', isbn.trim())
       if (user) params.append('userID', user.userID)
+      if (cursor) params.append('cursor', cursor)
       
       const res = await fetch(`${apiBase}/books/search?${params.toString()}`)
       const data = await res.json()
-      setResults(data)
+      setResults(prev => cursor ? [...prev, ...data] : data)
+      setNextCursor(res.headers.get('X-Next-Cursor'))
       
       const initialQtys = {}
       data.forEach(book => { initialQtys[book.ISBN] = 1 })
-      setQuantities(initialQtys)
+      setQuantities(prev => cursor ? { ...prev, ...initialQtys } : initialQtys)
     } catch (error) {
       console.error(error)
     } finally {
@@ -123,6 +126,12 @@ export default function Search() {
         })}
       </div>
 
+      {nextCursor && (
+        <button className="button" disabled={loading} onClick={() => doSearch(null, nextCursor)}>
+          {loading ? 'Loading...' : 'Load more'}
+        </button>
+      )}
+
       {/* --- BOOK DETAILS MODAL --- */}
       {selectedBook && (
         <div className="modal-overlay" style={{
@@ -21,13 +21,16 @@ CREATE TABLE Publisher (
   PubID INT AUTO_INCREMENT PRIMARY KEY,
   name VARCHAR(255) NOT NULL,
   phone VARCHAR(20),
-  address VARCHAR(255)
+  address VARCHAR(255),
+  KEY idx_publisher_name (name)
 );
 
 -- Table: Author
 CREATE TABLE Author (
   authorID INT AUTO_INCREMENT PRIMARY KEY,
-  author_name VARCHAR(255) NOT NULL
+  author_name VARCHAR(255) NOT NULL,
+  KEY idx_author_name (author_name),
+  FULLTEXT KEY ft_author_name (author_name)  -- Ranked author search
 );
 
 -- Table: Book
@@ -40,6 +43,12 @@ CREATE TABLE Book (
   threshold INT UNSIGNED NOT NULL,
   category ENUM('Science', 'Art', 'Religion', 'History', 'Geography') NOT NULL,
   PubID INT NOT NULL,
+  -- Search filters and sort orders (each also ends in ISBN, the PK)
+  KEY idx_book_category (category),
+  KEY idx_book_title (Title),
+  KEY idx_book_price (Price),
+  KEY idx_book_pubyear (pubYear),
+  FULLTEXT KEY ft_book_title (Title),  -- Ranked title search
   FOREIGN KEY (PubID) REFERENCES Publisher(PubID) ON DELETE CASCADE
 );
 
@@ -79,6 +88,10 @@ CREATE TABLE Customer_Order (
   card_number VARCHAR(20),
   card_expiry DATE,
   userID INT NOT NULL,
+  -- Date-range sales reports (covering: totalPrice is read from the index)
+  KEY idx_order_status_date (status, orderDate, totalPrice),
+  KEY idx_order_user_date (userID, orderDate),  -- Order history
+  KEY idx_order_date (orderDate),  -- Export date ranges
   FOREIGN KEY (userID) REFERENCES `user`(userID) ON DELETE CASCADE
 );
 
@@ -101,10 +114,72 @@ CREATE TABLE Publisher_Order (
   status ENUM('Pending', 'Confirmed') NOT NULL DEFAULT 'Pending',
   PubID INT NOT NULL,
   ISBN VARCHAR(20) NOT NULL,
+  KEY idx_porder_isbn_status (ISBN, status),
+  KEY idx_porder_date (orderDate, orderID),
+  KEY idx_porder_pub_date (PubID, orderDate),
   FOREIGN KEY (PubID) REFERENCES Publisher(PubID) ON DELETE CASCADE,
   FOREIGN KEY (ISBN) REFERENCES Book(ISBN) ON DELETE CASCADE
 );
 
+-- Sales rollups (maintained by checkout's background jobs, rebuilt with `python rollups.py backfill`)
+
+-- Table: Sales_Daily (completed sales per day, split over shards so
+-- concurrent checkouts don't all update the same row)
+CREATE TABLE Sales_Daily (
+  salesDate DATE NOT NULL,
+  shard TINYINT UNSIGNED NOT NULL,
+  totalSales DECIMAL(14,2) NOT NULL DEFAULT 0,
+  orderCount INT UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (salesDate, shard)
+);
+
+-- Table: Sales_Book_Daily (units and revenue per book per day)
+CREATE TABLE Sales_Book_Daily (
+  salesDate DATE NOT NULL,
+  ISBN VARCHAR(20) NOT NULL,
+  unitsSold INT UNSIGNED NOT NULL DEFAULT 0,
+  revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (salesDate, ISBN),
+  FOREIGN KEY (ISBN) REFERENCES Book(ISBN) ON DELETE CASCADE
+);
+
+-- Table: Sales_User_Total (lifetime spend per customer)
+CREATE TABLE Sales_User_Total (
+  userID INT PRIMARY KEY,
+  totalSpent DECIMAL(14,2) NOT NULL DEFAULT 0,
+  orderCount INT UNSIGNED NOT NULL DEFAULT 0,
+  KEY idx_total_spent (totalSpent),
+  FOREIGN KEY (userID) REFERENCES `user`(userID) ON DELETE CASCADE
+);
+
+-- Table: Job_Outbox (background jobs waiting to run or retry, see jobs.py;
+-- rows are deleted once their job has run)
+CREATE TABLE Job_Outbox (
+  jobID BIGINT AUTO_INCREMENT PRIMARY KEY,
+  kind VARCHAR(64) NOT NULL,
+  payload JSON NOT NULL,
+  status ENUM('Pending', 'Running', 'Failed') NOT NULL DEFAULT 'Pending',
+  attempts INT UNSIGNED NOT NULL DEFAULT 0,
+  createdAt DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+  availableAt DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+  claimedAt DATETIME(3) NULL,
+  lastError TEXT,
+  KEY idx_job_status_available (status, availableAt)  -- Poller: runnable jobs
+);
+
+-- Table: Schema_Migration (versions applied by `python migrate.py up`;
+-- this file already contains everything up to the version recorded below)
+CREATE TABLE Schema_Migration (
+  version INT PRIMARY KEY,
+  name VARCHAR(255) NOT NULL,
+  appliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO Schema_Migration (version, name) VALUES
+  (1, 'search_reports_rollups'),
+  (2, 'index_pack'),
+  (3, 'replenishment_engine'),
+  (4, 'job_outbox');
+
 -- Triggers for Integrity
 
 -- Prevent negative stock update
@@ -119,26 +194,18 @@ BEGIN
 END //
 DELIMITER ;
 
--- Auto-place replenishment order when stock drops below threshold
-DELIMITER //
-CREATE TRIGGER auto_place_order
-AFTER UPDATE ON Book
-FOR EACH ROW
-BEGIN
-  IF OLD.StockQuantity >= OLD.threshold AND NEW.StockQuantity < OLD.threshold THEN
-    INSERT INTO Publisher_Order (orderDate, Quantity, status, PubID, ISBN)
-    VALUES (CURDATE(), 50, 'Pending', NEW.PubID, NEW.ISBN);  -- Fixed quantity: 50
-  END IF;
-END //
-DELIMITER ;
+-- Replenishment orders are placed by replenishment.py from sales velocity
+-- (after each checkout and on a schedule), not by a trigger
 
 -- Add ordered quantity to stock on confirmation
+-- Bulk confirmation sets @bulk_confirm and adds stock itself in one
+-- aggregated UPDATE per ISBN, so the trigger stays out of the way then.
 DELIMITER //
 CREATE TRIGGER confirm_order_add_stock
 AFTER UPDATE ON Publisher_Order
 FOR EACH ROW
 BEGIN
-  IF NEW.status = 'Confirmed' AND OLD.status <> 'Confirmed' THEN
+  IF NEW.status = 'Confirmed' AND OLD.status <> 'Confirmed' AND @bulk_confirm IS NULL THEN
     UPDATE Book
     SET StockQuantity = StockQuantity + NEW.Quantity
     WHERE ISBN = NEW.ISBN;
@@ -147,6 +214,8 @@ END //
 DELIMITER ;
 
 -- Trigger to deduct stock on customer order completion (if app sets status to 'Completed')
+-- Checkout inserts orders as 'Completed' and deducts stock itself in one
+-- set-based UPDATE; this covers orders completed by a later status change.
 DELIMITER //
 CREATE TRIGGER deduct_on_completion
 AFTER UPDATE ON Customer_Order
@@ -240,4 +309,18 @@ INSERT INTO Customer_Order_Item (orderID, ISBN, Quantity, Price_at_purchase) VAL
 (1, '978-E3', 1, 120.00), (1, '978-E1', 1, 85.00),
 (2, '978-01', 1, 12.50), (2, '978-HP1', 3, 10.99),
 (3, '978-E3', 1, 120.00);
+
+-- 9. SALES ROLLUPS (built from the sample orders above)
+INSERT INTO Sales_Daily (salesDate, shard, totalSales, orderCount)
+SELECT orderDate, 0, SUM(totalPrice), COUNT(*)
+FROM Customer_Order WHERE status = 'Completed' GROUP BY orderDate;
+
+INSERT INTO Sales_Book_Daily (salesDate, ISBN, unitsSold, revenue)
+SELECT co.orderDate, coi.ISBN, SUM(coi.Quantity), SUM(coi.Quantity * coi.Price_at_purchase)
+FROM Customer_Order_Item coi JOIN Customer_Order co ON coi.orderID = co.orderID
+WHERE co.status = 'Completed' GROUP BY co.orderDate, coi.ISBN;
+
+INSERT INTO Sales_User_Total (userID, totalSpent, orderCount)
+SELECT userID, SUM(totalPrice), COUNT(*)
+FROM Customer_Order WHERE status = 'Completed' GROUP BY userID;
 SET FOREIGN_KEY_CHECKS = 1;
\ No newline at end of file
@@ -0,0 +1,363 @@
+"""
+Background jobs with a persistent outbox.
+
+Follow-up work that the caller doesn't need to wait for (sales rollups,
+replenishment after a checkout) runs on a small worker pool after the
+response is sent:
+
+- enqueue() inserts a Job_Outbox row inside the caller's transaction, so a
+  job exists if and only if the work that produced it was committed;
+- after the commit, JobQueue.submit() hands the job to this process's
+  workers, which start it right away;
+- a worker claims the row, runs the job's handler on a pooled connection
+  and deletes the row in the handler's transaction. Handlers that only
+  write through that connection therefore take effect exactly once;
+  handlers that commit on their own must be safe to run twice;
+- a handler can enqueue() follow-up jobs on its connection and return
+  them, so they exist only once its work committed and start right after;
+- a failed job goes back to Pending with exponential backoff and is marked
+  Failed after `max_attempts`;
+- a poller picks up retries, jobs submitted by processes that exited
+  before running them, and jobs whose worker died mid-run (after
+  `lease` seconds).
+
+drain() stops the queue on shutdown and lets queued jobs finish. Jobs it
+doesn't finish stay in the outbox for the next start. Failed jobs can be
+rerun with:
+
+    python jobs.py status
+    python jobs.py retry-failed
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+import metrics
+from db_pool import PoolTimeout
+
+logger = logging.getLogger("bookstore.jobs")
+
+job_runs = metrics.registry.register(metrics.Counter(
+    "bookstore_jobs_total", "Background job runs by kind and outcome.", ("kind", "outcome")))
+job_lag = metrics.registry.register(metrics.Histogram(
+    "bookstore_job_lag_seconds", "Time from a job becoming runnable to a worker starting it.",
+    ("kind",), buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)))
+job_duration = metrics.registry.register(metrics.Histogram(
+    "bookstore_job_duration_seconds", "Background job run time by kind.", ("kind",)))
+
+
+class Job:
+    def __init__(self, job_id, kind, payload, attempts=0, ready_at=None):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        # time.monotonic() at which the job became runnable, for job_lag
+        self.ready_at = time.monotonic() if ready_at is None else ready_at
+
+
+def enqueue(cursor, kind, payload):
+    """
+    Add a job to the outbox in the cursor's open transaction. Pass the
+    returned Job to JobQueue.submit() once that transaction has committed.
+    """
+    cursor.execute("INSERT INTO Job_Outbox (kind, payload) VALUES (%s, %s)",
+                   (kind, json.dumps(payload, default=str)))
+    return Job(cursor.lastrowid, kind, payload)
+
+
+def ready_jobs_query(limit):
+    """
+    Pending jobs whose backoff has elapsed, oldest first, with seconds waited.
+    """
+    query = """
+        SELECT jobID, kind, payload, attempts, TIMESTAMPDIFF(MICROSECOND, availableAt, NOW(3)) / 1000000
+        FROM Job_Outbox
+        WHERE status = 'Pending' AND availableAt <= NOW(3)
+        ORDER BY availableAt
+        LIMIT %s
+    """
+    return query, (limit,)
+
+
+def outbox_stats(cursor):
+    """
+    Outbox rows by status, with the age in seconds of the oldest of each.
+    """
+    cursor.execute("""
+        SELECT status, COUNT(*), TIMESTAMPDIFF(MICROSECOND, MIN(createdAt), NOW(3)) / 1000000
+        FROM Job_Outbox
+        GROUP BY status
+    """)
+    return {status: {"jobs": count, "oldest_seconds": float(age)} for status, count, age in cursor.fetchall()}
+
+
+class JobQueue:
+    """
+    In-process worker pool over the Job_Outbox table. `acquire()` and
+    `release(conn)` check connections out of and back into a pool.
+    """
+
+    def __init__(self, acquire, release, workers=2, max_attempts=8, retry_delay=1.0,
+                 max_retry_delay=300.0, poll_interval=1.0, lease=300.0, poll_batch=100):
+        self.acquire = acquire
+        self.release = release
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.poll_batch = poll_batch
+
+        self._handlers = {}
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._known = set()   # IDs queued or running in this process
+        self._running = 0
+        self._stopping = False
+        self._stop = threading.Event()
+        self._threads = []
+        self.outbox = {}      # outbox_stats() as of the last poll
+
+    def handler(self, kind):
+        """
+        Register `fn(conn, payload)` as the handler for jobs of `kind`.
+        It runs inside a transaction the queue commits; raise to retry.
+        """
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def start(self):
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        poller = threading.Thread(target=self._poll_loop, name="job-poller", daemon=True)
+        poller.start()
+        self._threads.append(poller)
+
+    def submit(self, *jobs):
+        with self._cond:
+            if self._stopping:
+                # Left in the outbox for the next start
+                return
+            for job in jobs:
+                if job.id not in self._known:
+                    self._known.add(job.id)
+                    self._queue.append(job)
+            self._cond.notify_all()
+
+    def drain(self, timeout=10.0):
+        """
+        Stop taking new jobs and wait up to `timeout` seconds for queued
+        and running ones. Returns how many were left in the outbox.
+        """
+        deadline = time.monotonic() + timeout
+        self._stop.set()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            while (self._queue or self._running) and self._threads:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            left = len(self._queue) + self._running
+            self._queue.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if left:
+            logger.warning("%d background jobs left in the outbox at shutdown", left)
+        return left
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                job = self._queue.popleft()
+                self._running += 1
+            try:
+                self.run(job)
+            except (PoolTimeout, mysql.connector.Error) as err:
+                # The database is unreachable; the poller retries the job
+                logger.warning("Job %s (%s) could not run: %s", job.id, job.kind, err)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._known.discard(job.id)
+                    self._cond.notify_all()
+
+    def run(self, job):
+        """
+        Claim, run and finish one job. Claiming only succeeds if nobody
+        else ran the job since it was read, so each attempt runs once.
+        """
+        conn = self.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Job_Outbox SET status = 'Running', attempts = attempts + 1, claimedAt = NOW(3)
+                WHERE jobID = %s AND status = 'Pending' AND attempts = %s
+            """, (job.id, job.attempts))
+            conn.commit()
+            if cursor.rowcount != 1:
+                job_runs.inc(job.kind, "skipped")
+                return
+            job.attempts += 1
+            job_lag.observe(time.monotonic() - job.ready_at, job.kind)
+
+            start = time.perf_counter()
+            try:
+                handler = self._handlers.get(job.kind)
+                if handler is None:
+                    raise LookupError(f"No handler for job kind {job.kind!r}")
+                follow_ups = handler(conn, job.payload) or ()
+                cursor.execute("DELETE FROM Job_Outbox WHERE jobID = %s", (job.id,))
+                if cursor.rowcount != 1:
+                    # Deleted while running (e.g. by a rollup backfill): cancelled
+                    conn.rollback()
+                    job_runs.inc(job.kind, "cancelled")
+                    return
+                conn.commit()
+                job_runs.inc(job.kind, "done")
+                self.submit(*follow_ups)
+            except Exception as err:
+                conn.rollback()
+                self._fail(cursor, job, err)
+                conn.commit()
+            finally:
+                job_duration.observe(time.perf_counter() - start, job.kind)
+        finally:
+            self.release(conn)
+
+    def _fail(self, cursor, job, err):
+        error = f"{type(err).__name__}: {err}"
+        if job.attempts >= self.max_attempts:
+            logger.error("Job %s (%s) failed after %d attempts: %s", job.id, job.kind, job.attempts, error)
+            cursor.execute("UPDATE Job_Outbox SET status = 'Failed', lastError = %s WHERE jobID = %s",
+                           (error, job.id))
+            job_runs.inc(job.kind, "failed")
+            return
+        # Exponential backoff with jitter, so jobs that failed together
+        # don't all retry at the same moment
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1.0)
+        logger.warning("Job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                       job.id, job.kind, job.attempts, delay, error)
+        cursor.execute("""
+            UPDATE Job_Outbox
+            SET status = 'Pending', lastError = %s, availableAt = NOW(3) + INTERVAL %s MICROSECOND
+            WHERE jobID = %s
+        """, (error, int(delay * 1000000), job.id))
+        job_runs.inc(job.kind, "retry")
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except (PoolTimeout, mysql.connector.Error) as err:
+                logger.warning("Job outbox poll failed: %s", err)
+
+    def poll(self):
+        """
+        Queue runnable outbox jobs this process doesn't already have, and
+        return jobs whose worker died (lease expired) to Pending.
+        """
+        conn = self.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Job_Outbox SET status = 'Pending'
+                WHERE status = 'Running' AND claimedAt < NOW(3) - INTERVAL %s SECOND
+            """, (self.lease,))
+            cursor.execute(*ready_jobs_query(self.poll_batch))
+            rows = cursor.fetchall()
+            self.outbox = outbox_stats(cursor)
+            conn.commit()
+        finally:
+            self.release(conn)
+        now = time.monotonic()
+        self.submit(*(Job(job_id, kind, json.loads(payload), attempts, now - float(waited))
+                      for job_id, kind, payload, attempts, waited in rows))
+
+    def stats(self):
+        with self._cond:
+            oldest = min((job.ready_at for job in self._queue), default=None)
+            return {
+                "workers": self.workers,
+                "queued": len(self._queue),
+                "running": self._running,
+                "oldest_queued_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "outbox": self.outbox,
+            }
+
+    def collect_metrics(self):
+        stats = self.stats()
+        depth = metrics.Gauge("bookstore_job_queue_depth", "Background jobs in this process by state.", ("state",))
+        depth.set("queued", value=stats["queued"])
+        depth.set("running", value=stats["running"])
+        oldest = metrics.Gauge("bookstore_job_queue_oldest_seconds",
+                               "Age of the oldest job waiting for a worker in this process.")
+        oldest.set(value=stats["oldest_queued_seconds"])
+        outbox = metrics.Gauge("bookstore_job_outbox_jobs", "Job_Outbox rows by status (as of the last poll).",
+                               ("status",))
+        outbox_age = metrics.Gauge("bookstore_job_outbox_oldest_seconds",
+                                   "Age of the oldest Job_Outbox row by status (as of the last poll).", ("status",))
+        for status in ("Pending", "Running", "Failed"):
+            entry = stats["outbox"].get(status, {"jobs": 0, "oldest_seconds": 0.0})
+            outbox.set(status, value=entry["jobs"])
+            outbox_age.set(status, value=entry["oldest_seconds"])
+        return [depth, oldest, outbox, outbox_age]
+
+
+def retry_failed(conn):
+    """
+    Give every Failed job a fresh set of attempts; running servers pick
+    them up on their next poll.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE Job_Outbox SET status = 'Pending', attempts = 0, availableAt = NOW(3)
+            WHERE status = 'Failed'
+        """)
+        conn.commit()
+        return {"retried": cursor.rowcount}
+    finally:
+        cursor.close()
+
+
+def main():
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "retry-failed"])
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        if args.command == "status":
+            result = outbox_stats(conn.cursor())
+        else:
+            result = retry_failed(conn)
+    finally:
+        conn.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
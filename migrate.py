@@ -0,0 +1,137 @@
+"""
+Versioned schema migrations.
+
+Migrations are the numbered files in migrations/ (0001_name.sql,
+0002_name.sql, ...). They are applied in order to a live database, and each
+applied version is recorded in Schema_Migration. Every migration is
+idempotent: "already exists" errors are skipped, so it is safe to run
+against a database created from an older or a current init.sql.
+
+    python migrate.py status
+    python migrate.py up
+    python migrate.py up --to 2
+"""
+import argparse
+import os
+import re
+
+import mysql.connector
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Table, duplicate column, duplicate key name and trigger already exist
+IGNORED_ERRNOS = {1050, 1060, 1061, 1359}
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """
+    Return [(version, name, path)] sorted by version.
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = re.match(r"^(\d+)_(\w+)\.sql$", filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in " + directory)
+    return migrations
+
+
+def split_statements(sql):
+    """
+    Split a script into statements, honouring mysql client DELIMITER lines.
+    """
+    statements, current, delimiter = [], [], ";"
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        current.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(current).rstrip()[:-len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Schema_Migration (
+          version INT PRIMARY KEY,
+          name VARCHAR(255) NOT NULL,
+          appliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    ensure_table(cursor)
+    cursor.execute("SELECT version FROM Schema_Migration")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply(conn, target=None, log=print):
+    """
+    Apply pending migrations up to `target` (all by default); returns the
+    versions applied. DDL commits implicitly in MySQL, so a failed migration
+    is left unrecorded and is retried from the top on the next run.
+    """
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, name, path in discover():
+            if version in done or (target is not None and version > target):
+                continue
+            log(f"Applying {version:04d}_{name}")
+            with open(path, encoding="utf-8") as f:
+                statements = split_statements(f.read())
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as err:
+                    if err.errno not in IGNORED_ERRNOS:
+                        raise
+                    log(f"  skipped (already applied): {err.msg}")
+            cursor.execute("INSERT INTO Schema_Migration (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.close()
+
+
+def main():
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description="Apply numbered schema migrations.")
+    parser.add_argument("command", choices=["status", "up"])
+    parser.add_argument("--to", type=int, help="Stop after this version")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        if args.command == "status":
+            cursor = conn.cursor()
+            done = applied_versions(cursor)
+            conn.commit()
+            cursor.close()
+            for version, name, _ in discover():
+                print(f"{'applied' if version in done else 'pending'}  {version:04d}_{name}")
+        else:
+            applied = apply(conn, args.to)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
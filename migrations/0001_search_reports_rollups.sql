@@ -0,0 +1,48 @@
+-- Schema added since the original init.sql: full-text search keys, the
+-- sales report index, the sales rollup tables and the bulk-confirm guard
+-- on confirm_order_add_stock.
+-- Fill the rollup tables afterwards with `python rollups.py backfill`.
+
+ALTER TABLE Author ADD FULLTEXT KEY ft_author_name (author_name);
+ALTER TABLE Book ADD FULLTEXT KEY ft_book_title (Title);
+ALTER TABLE Customer_Order ADD KEY idx_order_status_date (status, orderDate, totalPrice);
+
+CREATE TABLE IF NOT EXISTS Sales_Daily (
+  salesDate DATE NOT NULL,
+  shard TINYINT UNSIGNED NOT NULL,
+  totalSales DECIMAL(14,2) NOT NULL DEFAULT 0,
+  orderCount INT UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (salesDate, shard)
+);
+
+CREATE TABLE IF NOT EXISTS Sales_Book_Daily (
+  salesDate DATE NOT NULL,
+  ISBN VARCHAR(20) NOT NULL,
+  unitsSold INT UNSIGNED NOT NULL DEFAULT 0,
+  revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (salesDate, ISBN),
+  FOREIGN KEY (ISBN) REFERENCES Book(ISBN) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS Sales_User_Total (
+  userID INT PRIMARY KEY,
+  totalSpent DECIMAL(14,2) NOT NULL DEFAULT 0,
+  orderCount INT UNSIGNED NOT NULL DEFAULT 0,
+  KEY idx_total_spent (totalSpent),
+  FOREIGN KEY (userID) REFERENCES `user`(userID) ON DELETE CASCADE
+);
+
+DROP TRIGGER IF EXISTS confirm_order_add_stock;
+
+DELIMITER //
+CREATE TRIGGER confirm_order_add_stock
+AFTER UPDATE ON Publisher_Order
+FOR EACH ROW
+BEGIN
+  IF NEW.status = 'Confirmed' AND OLD.status <> 'Confirmed' AND @bulk_confirm IS NULL THEN
+    UPDATE Book
+    SET StockQuantity = StockQuantity + NEW.Quantity
+    WHERE ISBN = NEW.ISBN;
+  END IF;
+END //
+DELIMITER ;
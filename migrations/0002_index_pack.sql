@@ -0,0 +1,25 @@
+-- Secondary indexes for the lookups, filters and sort orders in backend.py.
+-- InnoDB appends the primary key to every secondary index, so the
+-- single-column Book indexes also serve the (sort key, ISBN) keyset pages.
+
+-- Order history per customer, newest first
+ALTER TABLE Customer_Order ADD KEY idx_order_user_date (userID, orderDate);
+-- Export date ranges over all statuses
+ALTER TABLE Customer_Order ADD KEY idx_order_date (orderDate);
+
+-- Replenishment count per book and pending orders per book
+ALTER TABLE Publisher_Order ADD KEY idx_porder_isbn_status (ISBN, status);
+-- Order list (newest first) and date-range exports
+ALTER TABLE Publisher_Order ADD KEY idx_porder_date (orderDate, orderID);
+-- Bulk confirmation by publisher and date
+ALTER TABLE Publisher_Order ADD KEY idx_porder_pub_date (PubID, orderDate);
+
+-- Search filters and sort orders
+ALTER TABLE Book ADD KEY idx_book_category (category);
+ALTER TABLE Book ADD KEY idx_book_title (Title);
+ALTER TABLE Book ADD KEY idx_book_price (Price);
+ALTER TABLE Book ADD KEY idx_book_pubyear (pubYear);
+
+-- Author and publisher pick lists (ORDER BY name)
+ALTER TABLE Author ADD KEY idx_author_name (author_name);
+ALTER TABLE Publisher ADD KEY idx_publisher_name (name);
@@ -0,0 +1,4 @@
+-- Replenishment is planned from sales velocity by replenishment.py (run
+-- after each checkout and periodically); the trigger that ordered a fixed
+-- 50 units whenever stock crossed the threshold would order on top of it.
+DROP TRIGGER IF EXISTS auto_place_order;
@@ -0,0 +1,16 @@
+-- Outbox for background jobs (see jobs.py): checkout records follow-up
+-- work (sales rollups, replenishment) here in its own transaction, and
+-- workers delete each row once its job has run.
+
+CREATE TABLE IF NOT EXISTS Job_Outbox (
+  jobID BIGINT AUTO_INCREMENT PRIMARY KEY,
+  kind VARCHAR(64) NOT NULL,
+  payload JSON NOT NULL,
+  status ENUM('Pending', 'Running', 'Failed') NOT NULL DEFAULT 'Pending',
+  attempts INT UNSIGNED NOT NULL DEFAULT 0,
+  createdAt DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+  availableAt DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+  claimedAt DATETIME(3) NULL,
+  lastError TEXT,
+  KEY idx_job_status_available (status, availableAt)
+);
@@ -0,0 +1,226 @@
+"""
+Demand-driven replenishment.
+
+Replaces the old fixed-quantity trigger (50 units whenever stock crossed
+`threshold`). Daily sales per book over the last HISTORY_DAYS days come
+from the Sales_Book_Daily rollup and are reduced to a few sums per book.
+One query loads those sums, stock and pending orders for the whole catalog
+into NumPy arrays, and the catalog is planned in one vectorized pass:
+
+- velocity: exponentially weighted units per day (recent days count more);
+- reorder point: demand over the lead time plus safety stock for the
+  day-to-day variation of sales, never below the book's `threshold`;
+- a book is reordered when stock plus pending publisher orders is below
+  its reorder point, up to the reorder point plus REVIEW_DAYS of demand.
+
+The planned orders are inserted as Pending Publisher_Order rows grouped by
+publisher. Runs are serialized with a MySQL named lock, so two runs never
+order the same shortfall twice. Checkout queues a run for the books it
+sold (a background job queued after the sale is rolled up, see jobs.py);
+a periodic full run (cron) catches everything else:
+
+    python replenishment.py run --dry-run
+    python replenishment.py run
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+import numpy as np
+
+HISTORY_DAYS = 90
+HALF_LIFE_DAYS = 14.0
+LEAD_TIME_DAYS = 7.0
+REVIEW_DAYS = 14.0
+SERVICE_Z = 1.65        # ~95% of lead times without a stockout
+MIN_ORDER_QUANTITY = 5
+INSERT_BATCH = 5000
+
+LOCK_NAME = "bookstore_replenishment"
+
+
+def load_query(today, history_days=HISTORY_DAYS, half_life=HALF_LIFE_DAYS, isbns=None):
+    """
+    One row per book with its stock, pending publisher orders and sales
+    moments over the window (units, squared units and decay-weighted
+    units). The sales are summed per book server-side, so no per-sale row
+    crosses the wire and the rows arrive already aligned with the catalog.
+    """
+    # With `isbns`, every part of the query is filtered by them (not just
+    # the outer join), so a small run never aggregates the whole window
+    book_filter = sales_filter = order_filter = ""
+    filter_params = ()
+    if isbns:
+        placeholders = ','.join(['%s'] * len(isbns))
+        book_filter = f"WHERE b.ISBN IN ({placeholders})"
+        sales_filter = f"AND ISBN IN ({placeholders})"
+        order_filter = f"AND ISBN IN ({placeholders})"
+        filter_params = tuple(isbns)
+    query = f"""
+        SELECT b.ISBN, b.PubID, b.StockQuantity, b.threshold,
+               -- DOUBLE rather than DECIMAL sums: NumPy takes floats far faster
+               CAST(COALESCE(s.units, 0) AS DOUBLE), CAST(COALESCE(s.units_sq, 0) AS DOUBLE),
+               COALESCE(s.weighted, 0), CAST(COALESCE(p.pending, 0) AS DOUBLE)
+        FROM Book b
+        LEFT JOIN (
+            SELECT ISBN, SUM(unitsSold) as units, SUM(unitsSold * unitsSold) as units_sq,
+                   SUM(unitsSold * POW(0.5, DATEDIFF(%s, salesDate) / %s)) as weighted
+            FROM Sales_Book_Daily
+            WHERE salesDate > %s AND salesDate <= %s {sales_filter}
+            GROUP BY ISBN
+        ) s ON s.ISBN = b.ISBN
+        LEFT JOIN (
+            SELECT ISBN, SUM(Quantity) as pending
+            FROM Publisher_Order
+            WHERE status = 'Pending' {order_filter}
+            GROUP BY ISBN
+        ) p ON p.ISBN = b.ISBN
+        {book_filter}
+    """
+    params = (today, half_life, today - timedelta(days=history_days), today, *filter_params,
+              *filter_params, *filter_params)
+    return query, params
+
+
+def load(cursor, today, history_days=HISTORY_DAYS, half_life=HALF_LIFE_DAYS, isbns=None):
+    """
+    Column arrays from load_query().
+    """
+    cursor.execute(*load_query(today, history_days, half_life, isbns))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    isbn, pub, stock, threshold, units, units_sq, weighted, pending = zip(*rows)
+    return {
+        "isbn": isbn,
+        "pub": np.array(pub, dtype=np.int64),
+        "stock": np.array(stock, dtype=np.float64),
+        "threshold": np.array(threshold, dtype=np.float64),
+        "units": np.array(units, dtype=np.float64),
+        "units_sq": np.array(units_sq, dtype=np.float64),
+        "weighted": np.array(weighted, dtype=np.float64),
+        "pending": np.array(pending, dtype=np.float64),
+    }
+
+
+def plan(books, history_days=HISTORY_DAYS, half_life=HALF_LIFE_DAYS, lead_time=LEAD_TIME_DAYS,
+         review=REVIEW_DAYS, z=SERVICE_Z, min_quantity=MIN_ORDER_QUANTITY):
+    """
+    Reorder quantity per book (0 = no order), plus each book's velocity and
+    reorder point. Pure NumPy over the arrays from load().
+    """
+    # Mean and deviation of daily units (days without sales count as zeros)
+    mean = books["units"] / history_days
+    std = np.sqrt(np.maximum(books["units_sq"] / history_days - mean * mean, 0.0))
+
+    # Exponentially weighted daily rate: weighted units over the weight of
+    # every day in the window
+    velocity = books["weighted"] / (0.5 ** (np.arange(history_days) / half_life)).sum()
+
+    reorder_point = np.maximum(velocity * lead_time + z * std * np.sqrt(lead_time), books["threshold"])
+    position = books["stock"] + books["pending"]
+    target = reorder_point + velocity * review
+    quantity = np.where(position < reorder_point, np.ceil(target - position), 0)
+    quantity = np.where(quantity > 0, np.maximum(quantity, min_quantity), 0).astype(np.int64)
+    return quantity, velocity, reorder_point
+
+
+def place_orders(cursor, books, quantity, today):
+    """
+    Insert one Pending Publisher_Order per reordered book, grouped by
+    publisher. Returns per-publisher totals.
+    """
+    chosen = np.nonzero(quantity)[0]
+    chosen = chosen[np.argsort(books["pub"][chosen], kind="stable")]
+    rows = [(today, int(quantity[i]), int(books["pub"][i]), books["isbn"][i]) for i in chosen]
+    for start in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany("""
+            INSERT INTO Publisher_Order (orderDate, Quantity, status, PubID, ISBN)
+            VALUES (%s, %s, 'Pending', %s, %s)
+        """, rows[start:start + INSERT_BATCH])
+    publishers = {}
+    for _, qty, pub_id, _ in rows:
+        totals = publishers.setdefault(pub_id, {"PubID": pub_id, "orders": 0, "units": 0})
+        totals["orders"] += 1
+        totals["units"] += qty
+    return list(publishers.values())
+
+
+def run(conn, isbns=None, dry_run=False, today=None, lock_timeout=10, **policy):
+    """
+    Plan and (unless dry_run) place replenishment orders for the catalog,
+    or only for `isbns`. Returns a summary; "skipped" is set when another
+    run holds the lock for longer than `lock_timeout` seconds.
+    """
+    today = today or date.today()
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+        if cursor.fetchone()[0] != 1:
+            return {"skipped": "another replenishment run is in progress"}
+        try:
+            books = load(cursor, today, policy.get("history_days", HISTORY_DAYS),
+                         policy.get("half_life", HALF_LIFE_DAYS), isbns)
+            if books is None:
+                return {"books": 0, "reordered": 0, "units": 0, "dry_run": dry_run, "publishers": [], "orders": []}
+            loaded = time.perf_counter()
+            quantity, velocity, reorder_point = plan(books, **policy)
+            planned = time.perf_counter()
+
+            chosen = np.nonzero(quantity)[0]
+            summary = {
+                "books": len(books["isbn"]),
+                "reordered": int(len(chosen)),
+                "units": int(quantity.sum()),
+                "dry_run": dry_run,
+                # A sample of the plan, largest orders first
+                "orders": [
+                    {"ISBN": books["isbn"][i], "PubID": int(books["pub"][i]), "Quantity": int(quantity[i]),
+                     "velocity": round(float(velocity[i]), 3), "reorder_point": round(float(reorder_point[i]), 1),
+                     "stock": int(books["stock"][i]), "pending": int(books["pending"][i])}
+                    for i in chosen[np.argsort(-quantity[chosen], kind="stable")][:100]
+                ],
+            }
+            if dry_run:
+                summary["publishers"] = []
+            else:
+                summary["publishers"] = place_orders(cursor, books, quantity, today)
+                conn.commit()
+            summary["seconds"] = {"load": round(loaded - started, 3), "plan": round(planned - loaded, 3),
+                                  "total": round(time.perf_counter() - started, 3)}
+            return summary
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def main():
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--dry-run", action="store_true", help="Plan only; place no orders")
+    parser.add_argument("--history-days", type=int, default=HISTORY_DAYS)
+    parser.add_argument("--lead-time", type=float, default=LEAD_TIME_DAYS)
+    parser.add_argument("--review", type=float, default=REVIEW_DAYS)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        result = run(conn, dry_run=args.dry_run, history_days=args.history_days,
+                     lead_time=args.lead_time, review=args.review)
+    finally:
+        conn.close()
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env bash
+# Clone the primary's bookstore database into the replica and start GTID
+# replication. Does nothing if the replica is already replicating.
+set -euo pipefail
+
+PRIMARY_HOST=${PRIMARY_HOST:-db}
+REPLICA_HOST=${REPLICA_HOST:-db_replica}
+PASSWORD=${MYSQL_ROOT_PASSWORD:-root}
+
+primary() { mysql -h "$PRIMARY_HOST" -uroot -p"$PASSWORD" "$@"; }
+replica() { mysql -h "$REPLICA_HOST" -uroot -p"$PASSWORD" "$@"; }
+
+# Both servers only accept TCP connections once their init scripts are done
+for host in "$PRIMARY_HOST" "$REPLICA_HOST"; do
+    echo "Waiting for $host..."
+    until mysqladmin ping -h "$host" -uroot -p"$PASSWORD" --silent 2>/dev/null; do
+        sleep 2
+    done
+done
+
+if [ -n "$(replica -N -e 'SHOW REPLICA STATUS')" ]; then
+    echo "Replication is already configured on $REPLICA_HOST"
+    exit 0
+fi
+
+primary -e "CREATE USER IF NOT EXISTS 'repl'@'%' IDENTIFIED WITH mysql_native_password BY 'repl';
+            GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';"
+
+echo "Copying bookstore from $PRIMARY_HOST to $REPLICA_HOST..."
+replica -e "SET GLOBAL super_read_only = OFF; RESET MASTER;"
+mysqldump -h "$PRIMARY_HOST" -uroot -p"$PASSWORD" --databases bookstore \
+    --single-transaction --triggers --routines --set-gtid-purged=ON | replica
+
+replica -e "CHANGE REPLICATION SOURCE TO SOURCE_HOST='$PRIMARY_HOST', SOURCE_USER='repl', SOURCE_PASSWORD='repl',
+                SOURCE_AUTO_POSITION=1, GET_SOURCE_PUBLIC_KEY=1;
+            START REPLICA;
+            SET PERSIST super_read_only = ON;"
+
+replica -e "SHOW REPLICA STATUS\G" | grep -E "Replica_(IO|SQL)_Running:|Seconds_Behind_Source"
+echo "Replication started"
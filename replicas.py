@@ -0,0 +1,143 @@
+"""
+Read replica pools with lag-aware routing.
+
+Each replica gets its own ConnectionPool. A monitor thread polls every
+replica's SHOW REPLICA STATUS on a dedicated connection. A replica is only
+used while its replication threads run and it is no more than `max_lag`
+seconds behind. A server that reports no replication at all is kept out of
+rotation too (replication was never set up or was reset, so its data may be
+arbitrarily old), unless the set is created with standalone=True for
+deliberately standalone readers. Read-only routes ask choose() for a replica and fall back
+to the primary when none qualifies (or its pool is exhausted).
+"""
+import itertools
+import logging
+import threading
+import time
+
+import mysql.connector
+
+import metrics
+from db_pool import ConnectionPool
+
+logger = logging.getLogger("bookstore.replicas")
+
+read_routing = metrics.registry.register(metrics.Counter(
+    "bookstore_db_read_routing_total", "Read-only requests by the database node that served them.",
+    ("target",)))
+
+
+class Replica:
+    def __init__(self, config, pool_config, standalone=False):
+        self.config = config
+        self.standalone = standalone
+        self.name = f"{config['host']}:{config.get('port', 3306)}"
+        self.pool = ConnectionPool(config, **pool_config)
+        self.lag = None
+        self.healthy = False
+        self.error = "not checked yet"
+        self.checked_at = None
+        self._monitor_conn = None
+
+    def check(self, max_lag):
+        """
+        Refresh lag and health from the replica's status.
+        """
+        try:
+            if self._monitor_conn is None or not self._monitor_conn.is_connected():
+                self._monitor_conn = mysql.connector.connect(**self.config)
+            cursor = self._monitor_conn.cursor(dictionary=True)
+            try:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except mysql.connector.Error:
+                    # Servers older than 8.0.22
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+            finally:
+                cursor.close()
+        except mysql.connector.Error as err:
+            self.set_status(None, False, f"status check failed: {err}")
+            self._monitor_conn = None
+            return
+
+        if status is None:
+            if self.standalone:
+                self.set_status(0, True, None)
+            else:
+                self.set_status(None, False, "not configured as a replica")
+            return
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        if lag is None:
+            self.set_status(None, False, "replication is not running")
+        elif lag > max_lag:
+            self.set_status(lag, False, f"{lag}s behind (max {max_lag}s)")
+        else:
+            self.set_status(lag, True, None)
+
+    def set_status(self, lag, healthy, error):
+        if healthy != self.healthy:
+            if healthy:
+                logger.warning("Replica %s back in rotation (lag %ss)", self.name, lag)
+            else:
+                logger.warning("Replica %s out of rotation: %s", self.name, error)
+        self.lag, self.healthy, self.error = lag, healthy, error
+        self.checked_at = time.time()
+
+    def stats(self):
+        return {"name": self.name, "healthy": self.healthy, "lag_seconds": self.lag, "error": self.error,
+                "checked_at": self.checked_at, "pool": self.pool.stats()}
+
+
+class ReplicaSet:
+    def __init__(self, configs, pool_config, max_lag=5.0, check_interval=2.0, standalone=False):
+        self.replicas = [Replica(config, pool_config, standalone) for config in configs]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check(self.max_lag)
+
+    def start(self):
+        """
+        Check every replica once, then keep checking in the background.
+        """
+        if not self.replicas or self._thread is not None:
+            return
+        self.check()
+        self._thread = threading.Thread(target=self._monitor, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def _monitor(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def choose(self):
+        """
+        Next healthy replica (round robin), or None to use the primary.
+        """
+        if not self.replicas:
+            return None
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._next)]
+                if replica.healthy:
+                    return replica
+        return None
+
+    def mark_failed(self, replica, error):
+        # Taken out of rotation until the next successful status check
+        replica.set_status(replica.lag, False, str(error))
+
+    def dispose(self):
+        self._stop.set()
+        for replica in self.replicas:
+            replica.pool.dispose()
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
@@ -0,0 +1,116 @@
+"""
+Sales rollup tables behind the admin reports.
+
+Checkout queues a "rollup_order" job in its transaction, and the job runs
+record_order() shortly after (see jobs.py), so the rollups trail
+Customer_Order by a moment but never miss or double count an order. For
+history written before the rollups existed (or after manual edits),
+rebuild them with:
+
+    python rollups.py backfill
+"""
+import argparse
+
+# Sales_Daily rows are split over this many shards per day
+SALES_DAILY_SHARDS = 16
+
+
+def record_order_queries(order_id):
+    """
+    The (query, params) upserts that add one completed order to the rollups.
+    """
+    return [
+        ("""
+            INSERT INTO Sales_Daily (salesDate, shard, totalSales, orderCount)
+            SELECT orderDate, %s, totalPrice, 1
+            FROM Customer_Order WHERE orderID = %s AND status = 'Completed'
+            ON DUPLICATE KEY UPDATE totalSales = totalSales + VALUES(totalSales),
+                                    orderCount = orderCount + 1
+        """, (order_id % SALES_DAILY_SHARDS, order_id)),
+        ("""
+            INSERT INTO Sales_Book_Daily (salesDate, ISBN, unitsSold, revenue)
+            SELECT co.orderDate, coi.ISBN, coi.Quantity, coi.Quantity * coi.Price_at_purchase
+            FROM Customer_Order_Item coi
+            JOIN Customer_Order co ON coi.orderID = co.orderID
+            WHERE coi.orderID = %s AND co.status = 'Completed'
+            ON DUPLICATE KEY UPDATE unitsSold = unitsSold + VALUES(unitsSold),
+                                    revenue = revenue + VALUES(revenue)
+        """, (order_id,)),
+        ("""
+            INSERT INTO Sales_User_Total (userID, totalSpent, orderCount)
+            SELECT userID, totalPrice, 1
+            FROM Customer_Order WHERE orderID = %s AND status = 'Completed'
+            ON DUPLICATE KEY UPDATE totalSpent = totalSpent + VALUES(totalSpent),
+                                    orderCount = orderCount + 1
+        """, (order_id,)),
+    ]
+
+
+def record_order(cursor, order_id):
+    """
+    Add one completed order to the rollups (three upserts, any cart size).
+    """
+    for query, params in record_order_queries(order_id):
+        cursor.execute(query, params)
+
+
+def backfill(conn):
+    """
+    Rebuild every rollup table from the full order history in one transaction.
+    Queued rollup jobs are cancelled, since their orders are counted here;
+    replenishment for those orders is left to the next full run.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM Job_Outbox WHERE kind = 'rollup_order'")
+        for table in ("Sales_Daily", "Sales_Book_Daily", "Sales_User_Total"):
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.execute("""
+            INSERT INTO Sales_Daily (salesDate, shard, totalSales, orderCount)
+            SELECT orderDate, 0, SUM(totalPrice), COUNT(*)
+            FROM Customer_Order WHERE status = 'Completed'
+            GROUP BY orderDate
+        """)
+        days = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO Sales_Book_Daily (salesDate, ISBN, unitsSold, revenue)
+            SELECT co.orderDate, coi.ISBN, SUM(coi.Quantity), SUM(coi.Quantity * coi.Price_at_purchase)
+            FROM Customer_Order_Item coi
+            JOIN Customer_Order co ON coi.orderID = co.orderID
+            WHERE co.status = 'Completed'
+            GROUP BY co.orderDate, coi.ISBN
+        """)
+        book_days = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO Sales_User_Total (userID, totalSpent, orderCount)
+            SELECT userID, SUM(totalPrice), COUNT(*)
+            FROM Customer_Order WHERE status = 'Completed'
+            GROUP BY userID
+        """)
+        users = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {"days": days, "book_days": book_days, "users": users}
+
+
+def main():
+    import mysql.connector
+    from backend import db_config
+
+    parser = argparse.ArgumentParser(description="Maintain the sales rollup tables.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.parse_args()
+
+    conn = mysql.connector.connect(**db_config)
+    try:
+        print(backfill(conn))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Per-request SQL tracing.
+
+get_db hands out traced connections: every statement is recorded against
+the current request with its normalized text, duration and row count.
+Statements slower than BOOKSTORE_SLOW_QUERY_MS are EXPLAINed once the
+route is done with the connection (never in the middle of a request),
+and a request that runs the same statement BOOKSTORE_N_PLUS_ONE times or
+more is flagged as a likely N+1. Slow statements and N+1 requests are
+logged as JSON on the "bookstore.sql" logger; recent traces and
+per-statement totals are served by GET /debug/sql.
+
+Only the sync routes are traced (aiomysql queries in backend_async are
+counted by metrics but not traced).
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+import mysql.connector
+
+import metrics
+
+logger = logging.getLogger("bookstore.sql")
+
+SLOW_QUERY_SECONDS = float(os.environ.get("BOOKSTORE_SLOW_QUERY_MS", "100")) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("BOOKSTORE_N_PLUS_ONE", "10"))
+MAX_STATEMENTS_PER_REQUEST = 500
+MAX_TRACKED_STATEMENTS = 1000
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(sql):
+    """
+    Statement text with literals and IN-list lengths folded away, so the
+    same statement with different arguments groups together.
+    """
+    sql = re.sub(r"'(?:[^'\\]|\\.|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"%s|%\(\w+\)s", "?", sql)
+    sql = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?+)", sql)
+    return " ".join(sql.split())
+
+
+class RequestTrace:
+    __slots__ = ("method", "path", "statements", "counts", "total", "db_seconds")
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.statements = []
+        self.counts = Counter()
+        self.total = 0
+        self.db_seconds = 0.0
+
+    def add(self, entry):
+        self.total += 1
+        self.db_seconds += entry["seconds"]
+        self.counts[entry["sql"]] += 1
+        if len(self.statements) < MAX_STATEMENTS_PER_REQUEST:
+            self.statements.append(entry)
+
+
+current_trace = contextvars.ContextVar("bookstore_sql_trace", default=None)
+
+_lock = threading.Lock()
+recent_requests = deque(maxlen=50)
+slow_queries = deque(maxlen=200)
+n_plus_one = deque(maxlen=100)
+statement_totals = {}   # normalized sql -> [count, seconds, max seconds, rows]
+_explained = {}         # normalized sql -> EXPLAIN rows (first capture wins)
+
+
+def _add_totals(entry):
+    with _lock:
+        totals = statement_totals.get(entry["sql"])
+        if totals is None:
+            if len(statement_totals) >= MAX_TRACKED_STATEMENTS:
+                return
+            totals = statement_totals[entry["sql"]] = [0, 0.0, 0.0, 0]
+        totals[0] += 1
+        totals[1] += entry["seconds"]
+        totals[2] = max(totals[2], entry["seconds"])
+        totals[3] += max(entry["rows"], 0)
+
+
+def _log(event, **fields):
+    logger.warning(json.dumps({"event": event, **fields}, default=str))
+
+
+class TracedCursor(metrics.InstrumentedCursor):
+    """
+    Instrumented cursor that also records each statement for the request.
+    """
+
+    def __init__(self, cursor, conn):
+        super().__init__(cursor)
+        self._traced_conn = conn
+        self._entry = None
+
+    def _record(self, operation, params, seconds, many=False):
+        rowcount = self._cursor.rowcount
+        entry = {"sql": normalize(operation), "seconds": seconds, "rows": max(rowcount, 0)}
+        self._entry = entry
+        _add_totals(entry)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(entry)
+        if not many and seconds >= SLOW_QUERY_SECONDS:
+            self._traced_conn.slow.append((operation, params, entry))
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute(operation, params, *args, **kwargs)
+        finally:
+            self._record(operation, params, time.perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._record(operation, None, time.perf_counter() - start, many=True)
+
+    # Unbuffered SELECTs only know their row count once rows are read
+    def _fetched(self, result):
+        if self._entry is not None and self._cursor.rowcount > self._entry["rows"]:
+            self._entry["rows"] = self._cursor.rowcount
+        return result
+
+    def fetchone(self):
+        return self._fetched(self._cursor.fetchone())
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._fetched(self._cursor.fetchall())
+
+
+class TracedConnection(metrics.InstrumentedConnection):
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.slow = []
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs), self)
+
+    def finish(self):
+        """
+        EXPLAIN and log this connection's slow statements. Call once the
+        route is done with the connection, before it goes back to the pool.
+        """
+        slow, self.slow = self.slow, []
+        for operation, params, entry in slow:
+            entry["explain"] = self._explain(operation, params, entry["sql"])
+            record = {"sql": entry["sql"], "ms": round(entry["seconds"] * 1000, 3),
+                      "rows": entry["rows"], "explain": entry["explain"]}
+            trace = current_trace.get()
+            if trace is not None:
+                record["request"] = f"{trace.method} {trace.path}"
+            slow_queries.append(record)
+            _log("slow_query", **record)
+
+    def _explain(self, operation, params, sql):
+        if sql in _explained:
+            return _explained[sql]
+        if not operation.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            cursor = self._conn.cursor(dictionary=True, buffered=True)
+            try:
+                cursor.execute("EXPLAIN " + operation, params)
+                plan = cursor.fetchall()
+            finally:
+                cursor.close()
+        except mysql.connector.Error as err:
+            return [{"error": str(err)}]
+        if len(_explained) < MAX_TRACKED_STATEMENTS:
+            _explained[sql] = plan
+        return plan
+
+
+def instrument(conn):
+    return TracedConnection(conn)
+
+
+def finish_request(trace, route, status, seconds):
+    repeated = {sql: count for sql, count in trace.counts.items() if count >= N_PLUS_ONE_THRESHOLD}
+    summary = {
+        "route": f"{trace.method} {route}",
+        "path": trace.path,
+        "status": status,
+        "ms": round(seconds * 1000, 3),
+        "queries": trace.total,
+        "db_ms": round(trace.db_seconds * 1000, 3),
+        "statements": [{"sql": e["sql"], "ms": round(e["seconds"] * 1000, 3), "rows": e["rows"]}
+                       for e in trace.statements],
+    }
+    recent_requests.append(summary)
+    if repeated:
+        record = {"route": summary["route"], "path": trace.path, "queries": trace.total, "repeated": repeated}
+        n_plus_one.append(record)
+        _log("n_plus_one", **record)
+
+
+def snapshot(limit=20):
+    """
+    Debug view: recent requests, slow statements, N+1 requests and the
+    statements with the most total time.
+    """
+    with _lock:
+        totals = sorted(statement_totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return {
+        "slow_query_ms": SLOW_QUERY_SECONDS * 1000,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "recent_requests": list(recent_requests)[-limit:],
+        "slow_queries": list(slow_queries)[-limit:],
+        "n_plus_one": list(n_plus_one)[-limit:],
+        "top_statements": [
+            {"sql": sql, "count": count, "total_ms": round(total * 1000, 3),
+             "avg_ms": round(total * 1000 / count, 3), "max_ms": round(worst * 1000, 3), "rows": rows}
+            for sql, (count, total, worst, rows) in totals
+        ],
+    }
+
+
+class SQLTraceMiddleware:
+    """
+    Pure ASGI middleware that opens a RequestTrace for each HTTP request.
+    """
+
+    def __init__(self, app, exclude=("/metrics", "/debug/sql")):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = current_trace.set(trace)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            finish_request(trace, metrics.route_label(scope), status, time.perf_counter() - start)
@@ -0,0 +1,37 @@
+"""
+EXPLAIN regression check (see explain_check.py) as one test per endpoint
+query. Needs the seeded database from backend.db_config; the tests are
+skipped when it cannot be reached.
+"""
+import warnings
+
+import mysql.connector
+import pytest
+
+import backend
+import explain_check
+
+CASE_NAMES = [name for name, *_ in explain_check.cases(explain_check.default_samples())]
+
+
+@pytest.fixture(scope="module")
+def explain_cases():
+    try:
+        conn = mysql.connector.connect(**backend.db_config)
+    except mysql.connector.Error as err:
+        pytest.skip(f"database not reachable: {err}")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        yield cursor, {case[0]: case[1:] for case in explain_check.cases(explain_check.samples(cursor))}
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("name", CASE_NAMES)
+def test_no_unindexed_full_scan(explain_cases, name):
+    cursor, cases = explain_cases
+    failures, scan_warnings = explain_check.check(cursor, name, *cases[name])
+    for warning in scan_warnings:
+        warnings.warn(warning)
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,88 @@
+"""
+/books/search must run the same number of statements for one result as
+for a full page (no per-book author or cart lookups). Runs against a fake
+connection that counts execute() calls, so no database is needed.
+"""
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+
+
+class CountingCursor:
+    def __init__(self, books):
+        self.books = books
+        self.statements = []
+        self._rows = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        # Answer for the ISBNs the statement asks about
+        isbns = [book["ISBN"] for book in self.books if book["ISBN"] in (params or ())]
+        if "FROM Book_Author" in query:
+            self._rows = [{"ISBN": isbn, "authorID": 1, "author_name": "Author"} for isbn in isbns]
+        elif "FROM Cart_Item" in query:
+            self._rows = [{"ISBN": isbn, "Quantity": 1} for isbn in isbns]
+        else:
+            self._rows = [dict(book) for book in self.books]
+
+    def fetchall(self):
+        return self._rows
+
+
+class CountingConnection:
+    def __init__(self, books):
+        self.cursors = []
+        self.books = books
+
+    def cursor(self, **kwargs):
+        cursor = CountingCursor(self.books)
+        self.cursors.append(cursor)
+        return cursor
+
+    @property
+    def statements(self):
+        return [statement for cursor in self.cursors for statement in cursor.statements]
+
+
+def make_books(count):
+    return [
+        {"ISBN": f"978-{i:06d}", "Title": f"Title {i}", "pubYear": 2000, "Price": Decimal("9.99"),
+         "StockQuantity": 5, "threshold": 2, "category": "Science", "PubID": 1, "publisher_name": "Pub"}
+        for i in range(count)
+    ]
+
+
+def statements_for(count, params):
+    conn = CountingConnection(make_books(count))
+    backend.app.dependency_overrides[backend.get_search_db] = lambda: conn
+    try:
+        response = TestClient(backend.app).get("/books/search", params=params)
+    finally:
+        backend.app.dependency_overrides.pop(backend.get_search_db)
+    assert response.status_code == 200
+    assert len(response.json()) == count
+    return conn.statements
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"title": "Title"}, 2),               # page + authors
+    ({"title": "Title", "userID": 7}, 3),  # page + authors + cart quantities
+])
+def test_statement_count_does_not_grow_with_results(params, expected):
+    one = statements_for(1, params)
+    many = statements_for(backend.SEARCH_DEFAULT_PAGE_SIZE, params)
+    assert len(one) == len(many) == expected
+
+
+def test_authors_and_cart_are_attached_to_every_book():
+    conn = CountingConnection(make_books(3))
+    backend.app.dependency_overrides[backend.get_search_db] = lambda: conn
+    try:
+        books = TestClient(backend.app).get("/books/search", params={"userID": 7}).json()
+    finally:
+        backend.app.dependency_overrides.pop(backend.get_search_db)
+    assert all(book["authors"] == [{"authorID": 1, "author_name": "Author"}] for book in books)
+    assert all(book["AvailableStock"] == 4 for book in books)